@@ -1,15 +1,42 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # 시작 시간 측정 기준점 (--startup-timing)
+
 import pygame
 import sys
+import os
+import gc
+import argparse
+import tracemalloc
 import math
 import random
+import struct
+import hashlib
+import json
+import queue
+import threading
+import weakref
+from collections import deque
+
+# 텍스처 렌더러 (--renderer texture) 는 pygame 의 실험적 SDL2 API 를 쓴다.
+# 없는 환경에서는 기존 Surface 렌더링만 사용한다.
+try:
+    from pygame._sdl2 import video as sdl2_video
+except ImportError:
+    sdl2_video = None
 
 # 기본 상수 설정(고정될 값은 대문자로 표현하기)
 # 기본 게임 화면 설정
 SCREEN_WIDTH = 1280  
 SCREEN_HEIGHT = 720  
 FPS = 60
+SIM_HZ = 60  # 시뮬레이션(물리/게임 로직) 고정 틱 속도 - 렌더링 FPS 와 별개
+SIM_STEP_MS = 1000 / SIM_HZ
+MAX_SIM_STEPS_PER_FRAME = 5  # 렌더링이 밀렸을 때 한 프레임에 돌릴 최대 틱 수 (렌더링 FPS 가 낮으면 Game 에서 더 늘린다)
 GRAVITY = 0.13  # 중력세기 테스트중
+# 땅 위에 서 있는 플레이어는 중력으로 이 틱 수마다 1픽셀 내려갔다가 다시 올라온다 (잠든 플레이어 깨울 때 사용)
+SETTLE_PERIOD = math.ceil(1 / GRAVITY)
 PROJECTILE_VELOCITY = 10  # 발사 세기 (고정)
+GREEN_SPLIT_DELAY = 700  # 그린 스킬: 몇 ms 후에 분리 되는지 설정
 
 # 색상 설정
 BLACK = (0, 0, 0)
@@ -31,6 +58,385 @@ TILE_SIZE = 5  # 맵 타일 크기
 MAP_WIDTH = SCREEN_WIDTH // TILE_SIZE
 MAP_HEIGHT = SCREEN_HEIGHT // TILE_SIZE
 
+# AI 난이도별 탐색 예산
+# frame_budget_ms: 한 프레임에 AI가 생각할 수 있는 시간
+# max_evaluations: 한 턴에 시뮬레이션해 볼 수 있는 후보 수
+# skill_chance: 보너스 게이지 성공 확률 / aim_error: 최종 각도 오차(도)
+AI_DIFFICULTY = {
+    'easy':   {'frame_budget_ms': 1.0, 'max_evaluations': 40,  'skill_chance': 0.2, 'aim_error': 8},
+    'normal': {'frame_budget_ms': 3.0, 'max_evaluations': 160, 'skill_chance': 0.4, 'aim_error': 3},
+    'hard':   {'frame_budget_ms': 5.0, 'max_evaluations': 480, 'skill_chance': 0.7, 'aim_error': 0},
+}
+
+# 게임 상태 스냅샷(롤백, AI 미리보기, 저장/이어하기용) 바이너리 포맷
+SNAPSHOT_MAGIC = b'GTSN'
+SNAPSHOT_VERSION = 5
+GAME_STATES = ("MOVE", "AIM_1", "AIM_2", "FIRE", "GAMEOVER")
+# 헤더 / 게임 변수 / 플레이어 / 발사체 / 크레이터 / 난수 상태
+SNAPSHOT_HEADER = struct.Struct('<4sB')
+SNAPSHOT_GAME = struct.Struct('<BIIBBbiiddbh?Bd?')
+SNAPSHOT_PLAYER = struct.Struct('<iiddd??I')
+SNAPSHOT_PROJECTILE = struct.Struct('<ddddBB??i')
+SNAPSHOT_CRATER = struct.Struct('<hhh')
+SNAPSHOT_COUNT = struct.Struct('<H')
+SNAPSHOT_RNG = struct.Struct('<B625I?d')
+
+# 디코딩 + 크기 조절이 끝난 이미지를 원시 픽셀로 저장해 두는 디스크 캐시
+# (파일 이름 = 원본 파일 해시 + 목표 크기 + 포맷 + 캐시 버전. 원본이 바뀌면 자동으로 새로 만든다)
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.asset_cache')
+ASSET_CACHE_VERSION = 1
+ASSET_CACHE_HEADER = struct.Struct('<4sHHH4s') # 매직, 버전, 너비, 높이, 픽셀 포맷
+ASSET_CACHE_MAGIC = b'GTAC'
+
+_image_cache = {}
+_font_cache = {}
+
+def load_image(path, size=None, alpha=False):
+    """이미지를 읽어 (size 로 크기를 맞춘 뒤) 화면 포맷으로 변환해서 돌려줍니다.
+
+    같은 프로세스에서는 메모리 캐시를, 다음 실행부터는 디스크 캐시의 원시 픽셀을 한 번에 읽어 쓴다.
+    """
+    key = (path, size, alpha)
+    if key in _image_cache:
+        return _image_cache[key]
+
+    pixel_format = 'RGBA' if alpha else 'RGB'
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha1(source).hexdigest()
+    size_name = f"{size[0]}x{size[1]}" if size else "orig"
+    cache_path = os.path.join(ASSET_CACHE_DIR, f"{digest}_{size_name}_{pixel_format}_v{ASSET_CACHE_VERSION}.raw")
+
+    image = None
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        magic, version, width, height, cached_format = ASSET_CACHE_HEADER.unpack_from(data)
+        if magic == ASSET_CACHE_MAGIC and version == ASSET_CACHE_VERSION and cached_format == pixel_format.encode().ljust(4):
+            image = pygame.image.frombuffer(memoryview(data)[ASSET_CACHE_HEADER.size:], (width, height), pixel_format)
+    except (OSError, struct.error, ValueError):
+        image = None
+
+    if image is None:
+        # 캐시가 없으면 원본을 디코딩하고 크기를 맞춘 뒤 캐시에 저장
+        image = pygame.image.load(path)
+        if size:
+            image = pygame.transform.scale(image, size)
+        try:
+            os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+            header = ASSET_CACHE_HEADER.pack(ASSET_CACHE_MAGIC, ASSET_CACHE_VERSION, *image.get_size(),
+                                             pixel_format.encode().ljust(4))
+            temp_path = cache_path + f".{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(header + pygame.image.tobytes(image, pixel_format))
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass # 캐시를 못 써도 게임은 계속
+
+    image = image.convert_alpha() if alpha else image.convert()
+    _image_cache[key] = image
+    return image
+
+def get_font(size):
+    # 폰트 모듈은 처음 쓸 때 초기화 (기본 폰트는 시스템 폰트 목록 검색 없이 바로 읽음)
+    if size not in _font_cache:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        _font_cache[size] = pygame.font.Font(None, size)
+    return _font_cache[size]
+
+# 시작 시간 측정 (처음 화면이 나올 때까지 단계별 시간)
+class StartupTimer:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = [("모듈 로드", time.perf_counter())]
+        self.reported = False
+
+    def mark(self, name):
+        # 보고한 뒤에는 (선택창 매 프레임, 재시작 후 등) 더 모으지 않는다
+        if self.enabled and not self.reported:
+            self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        print("시작 시간 (모듈 로드 시점부터 첫 화면까지):")
+        previous = STARTUP_BEGIN
+        for name, at in self.marks:
+            print(f"  {name:<20} {(at - previous) * 1000:8.1f} ms   (누적 {(at - STARTUP_BEGIN) * 1000:8.1f} ms)")
+            previous = at
+
+# 입력 지연 측정 (--input-latency)
+# 키 입력이 도착한 시각부터 handle_events 처리, 상태 변경(시뮬레이션 반영), 화면 표시(flip)까지
+# 걸린 시간을 입력이 들어온 게임 상태별로 모은다.
+INPUT_LATENCY_BUCKETS = (4, 8, 16, 24, 33, 50, 100) # 히스토그램 구간 상한 (ms), 마지막은 그 이상
+
+class InputLatency:
+    def __init__(self):
+        self.pending = [] # [상태, 도착, 처리, 반영] - 아직 화면에 나오지 않은 입력
+        self.samples = {} # 상태 -> [(처리, 반영, 표시) ms]
+
+    def handled(self, state, arrival, handled, applied=None):
+        # applied 가 None 이면 다음 시뮬레이션 틱에서 반영된다 (이동 키)
+        self.pending.append([state, arrival, handled, applied])
+
+    def simulated(self, now):
+        for record in self.pending:
+            if record[3] is None:
+                record[3] = now
+
+    def presented(self, now):
+        for state, arrival, handled, applied in self.pending:
+            applied = now if applied is None else applied
+            self.samples.setdefault(state, []).append(
+                ((handled - arrival) * 1000, (applied - arrival) * 1000, (now - arrival) * 1000))
+        self.pending.clear()
+
+    def summary(self):
+        """상태별 입력 -> 화면 지연 통계 (ms)"""
+        summary = {}
+        for state, samples in self.samples.items():
+            total = sorted(sample[2] for sample in samples)
+            counts = [0] * (len(INPUT_LATENCY_BUCKETS) + 1)
+            for value in total:
+                counts[sum(1 for bound in INPUT_LATENCY_BUCKETS if value > bound)] += 1
+            summary[state] = {
+                'count': len(total),
+                'handled_ms': round(sum(sample[0] for sample in samples) / len(samples), 2),
+                'applied_ms': round(sum(sample[1] for sample in samples) / len(samples), 2),
+                'p50_ms': round(total[len(total) // 2], 2),
+                'p95_ms': round(total[min(len(total) - 1, int(len(total) * 0.95))], 2),
+                'max_ms': round(total[-1], 2),
+                'histogram': counts,
+            }
+        return summary
+
+    def print_report(self):
+        print("입력 지연 (키 도착 -> 화면 표시):")
+        labels = [f"~{bound}ms" for bound in INPUT_LATENCY_BUCKETS] + [f"{INPUT_LATENCY_BUCKETS[-1]}ms~"]
+        for state, stats in self.summary().items():
+            print(f"  {state:<8} {stats['count']:4d}회   p50 {stats['p50_ms']:6.1f} ms   p95 {stats['p95_ms']:6.1f} ms"
+                  f"   max {stats['max_ms']:6.1f} ms   (처리 {stats['handled_ms']:.1f} / 반영 {stats['applied_ms']:.1f} ms)")
+            for label, count in zip(labels, stats['histogram']):
+                if count:
+                    print(f"    {label:>7} {'#' * min(count, 50)} {count}")
+
+# 텍스처 렌더러 백엔드
+# 배경/캐릭터/발사체 이미지는 처음 한 번만 텍스처로 올리고 매 프레임 합성만 한다.
+# 지형은 화면 크기 텍스처 하나에 그려 두고, 새 크레이터가 생긴 영역만 다시 올린다.
+# HUD 도 투명 텍스처에 그려 두고 이번/지난 프레임에 그린 영역만 갱신한다.
+# 하드웨어 가속 렌더러를 만들 수 없으면 SDL 소프트웨어 렌더러로 대신한다.
+class TextureRenderer:
+    def __init__(self, title, size, accelerated=True):
+        if sdl2_video is None:
+            raise RuntimeError("pygame._sdl2.video 를 사용할 수 없어 텍스처 렌더러를 만들 수 없습니다.")
+        self.size = size
+        self.window = sdl2_video.Window(title, size)
+        self.renderer = None
+        self.accelerated = False
+        if accelerated:
+            try:
+                self.renderer = sdl2_video.Renderer(self.window, accelerated=1)
+                self.accelerated = True
+            except RuntimeError: # (pygame._sdl2 의 오류는 RuntimeError 계열)
+                pass # 소프트웨어 렌더러로 대신
+        if self.renderer is None:
+            self.renderer = sdl2_video.Renderer(self.window, accelerated=0)
+
+        # 원본 Surface -> Texture (재시작 때마다 새로 만드는 플레이어 이미지 등은 Surface 가 사라지면 같이 정리)
+        self.textures = weakref.WeakKeyDictionary()
+        self.screen_texture = None # present_surface() 용 (선택창 등 Surface 로 그리는 화면)
+
+        self.terrain_surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.terrain_texture = self.streaming_texture()
+        self.terrain = None # 마지막으로 올린 지형과 그 revision (바뀌면 전체를 다시 올림)
+        self.terrain_revision = None
+        self.terrain_craters = 0 # 이미 반영한 크레이터 수
+        self.terrain_uploads = 0 # 지형 텍스처를 갱신한 횟수 (벤치마크/점검용)
+
+        self.hud_surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.hud_texture = self.streaming_texture()
+        self.hud_dirty = []
+
+    def streaming_texture(self):
+        texture = sdl2_video.Texture(self.renderer, self.size, streaming=True)
+        texture.blend_mode = 1 # SDL_BLENDMODE_BLEND (투명 영역은 아래가 보이게)
+        return texture
+
+    def texture(self, surface):
+        # 정적 이미지는 처음 쓸 때 한 번만 텍스처로 올린다
+        if surface not in self.textures:
+            self.textures[surface] = sdl2_video.Texture.from_surface(self.renderer, surface)
+        return self.textures[surface]
+
+    def clear(self, color):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.clear()
+
+    def blit(self, surface, dest):
+        rect = surface.get_rect(topleft=dest) if len(dest) == 2 else dest
+        self.texture(surface).draw(dstrect=rect)
+
+    def fill_rect(self, color, rect):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.fill_rect(rect)
+
+    def line(self, color, start, end, width=1):
+        # 렌더러의 선은 1픽셀이라 굵은 선은 수직 방향으로 한 칸씩 옮겨 여러 번 그린다
+        self.renderer.draw_color = pygame.Color(color)
+        length = math.hypot(end[0] - start[0], end[1] - start[1]) or 1
+        normal_x, normal_y = -(end[1] - start[1]) / length, (end[0] - start[0]) / length
+        for offset in range(-(width // 2), width - width // 2):
+            shift_x, shift_y = normal_x * offset, normal_y * offset
+            self.renderer.draw_line((round(start[0] + shift_x), round(start[1] + shift_y)),
+                                    (round(end[0] + shift_x), round(end[1] + shift_y)))
+
+    def draw_terrain(self, terrain):
+        if (terrain is not self.terrain or terrain.revision != self.terrain_revision
+                or len(terrain.craters) < self.terrain_craters):
+            # 새 맵 또는 스냅샷 복원: 전체를 다시 그린다
+            self.terrain_surface.fill((0, 0, 0, 0))
+            terrain.draw(self.terrain_surface)
+            self.terrain_texture.update(self.terrain_surface)
+            self.terrain_uploads += 1
+        else:
+            for x, y, radius in terrain.craters[self.terrain_craters:]:
+                rect = terrain.crater_rect(x, y, radius)
+                if not rect:
+                    continue
+                self.terrain_surface.fill((0, 0, 0, 0), rect)
+                terrain.draw(self.terrain_surface, area=rect)
+                self.terrain_texture.update(self.terrain_surface.subsurface(rect), rect)
+                self.terrain_uploads += 1
+        self.terrain = terrain
+        self.terrain_revision = terrain.revision
+        self.terrain_craters = len(terrain.craters)
+        self.terrain_texture.draw()
+
+    def draw_hud(self, draw):
+        # draw(surface) 는 HUD 를 그리고 그린 영역 목록을 돌려준다
+        for rect in self.hud_dirty:
+            self.hud_surface.fill((0, 0, 0, 0), rect)
+        dirty = draw(self.hud_surface)
+        bounds = self.hud_surface.get_rect()
+        for rect in self.hud_dirty + dirty:
+            rect = rect.clip(bounds)
+            if rect:
+                self.hud_texture.update(self.hud_surface.subsurface(rect), rect)
+        self.hud_dirty = dirty
+        self.hud_texture.draw()
+
+    def present(self):
+        self.renderer.present()
+
+    def present_surface(self, surface):
+        # Surface 에 그린 화면(캐릭터 선택창 등)을 통째로 올려서 보여주기
+        if self.screen_texture is None:
+            self.screen_texture = sdl2_video.Texture(self.renderer, self.size, streaming=True)
+        self.screen_texture.update(surface)
+        self.screen_texture.draw()
+        self.renderer.present()
+
+# 이벤트 로그 레벨
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30}
+
+# 게임 이벤트 로그 클래스
+# 게임 루프는 크기가 정해진 큐에 기록을 넣기만 하고, 실제 파일/stdout 쓰기는 백그라운드 스레드가 한다.
+# 큐가 가득 차면 drop_policy 에 따라 새 기록('newest') 또는 가장 오래된 기록('oldest')을 버리므로
+# 느린 로그 수집기 때문에 게임 루프가 멈추는 일이 없다. 기록은 한 줄에 하나씩 JSON 으로 남는다.
+class EventLog:
+    def __init__(self, path=None, level='info', max_queue=1024, drop_policy='newest'):
+        if drop_policy not in ('newest', 'oldest'):
+            raise ValueError(f"알 수 없는 drop_policy 입니다: {drop_policy}")
+        self.path = path
+        self.level = LOG_LEVELS[level]
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.matches = 0
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.writer = threading.Thread(target=self.write_loop, name="EventLog", daemon=True)
+        self.writer.start()
+
+    def new_match(self):
+        self.matches += 1
+        return self.matches
+
+    def log(self, level, event, **fields):
+        """이벤트 하나를 기록합니다. (절대 기다리지 않음)"""
+        if LOG_LEVELS[level] < self.level:
+            return
+        record = {'level': level, 'event': event}
+        record.update(fields)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.drop_policy == 'oldest':
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def write_loop(self):
+        stream = open(self.path, 'a', encoding='utf-8') if self.path else sys.stdout
+        try:
+            while True:
+                record = self.queue.get()
+                if record is None:
+                    break
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+                # 큐가 비었을 때만 flush (몰려올 때는 한 번에 쓰기)
+                if self.queue.empty():
+                    stream.flush()
+        finally:
+            stream.flush()
+            if self.path:
+                stream.close()
+
+    def close(self, timeout=1.0):
+        # 남은 기록을 다 쓰고 스레드 종료
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.writer.join(timeout)
+
+# 이벤트 로그(JSON lines)로 경기별 통계 만들기
+def summarize_event_log(path):
+    matches = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'match' not in record:
+                continue
+            stats = matches.setdefault(record['match'], {'ticks': 0, 'turns': 0, 'winner': None, 'players': {}})
+            stats['ticks'] = max(stats['ticks'], record.get('tick', 0))
+            player = stats['players'].setdefault(record.get('player'), {'shots': 0, 'skill_shots': 0, 'impacts': 0})
+            event = record['event']
+            if event == 'fire':
+                player['shots'] += 1
+                player['skill_shots'] += record.get('bonus', False)
+            elif event == 'impact':
+                player['impacts'] += 1
+            elif event == 'turn_start':
+                stats['turns'] += 1
+            elif event == 'winner':
+                stats['winner'] = record['player']
+    for stats in matches.values():
+        stats['players'].pop(None, None)
+    return matches
+
+# 따로 지정하지 않은 게임들이 함께 쓰는 기본 로그 (stdout)
+_default_event_log = None
+
+def default_event_log():
+    global _default_event_log
+    if _default_event_log is None:
+        _default_event_log = EventLog()
+    return _default_event_log
+
 # 플레이어 클래스 설정
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y, color, controls, char_type=1, is_ai=False):
@@ -42,14 +448,11 @@ class Player(pygame.sprite.Sprite):
         size_default = (TILE_SIZE * 10, TILE_SIZE * 10) # 기본 사각형
 
         if char_type == 1:
-            self.image = pygame.image.load('./images/red.png').convert_alpha()
-            self.image = pygame.transform.scale(self.image, size_red)
+            self.image = load_image('./images/red.png', size_red, alpha=True)
         elif char_type == 2:
-            self.image = pygame.image.load('./images/blue.png').convert_alpha()
-            self.image = pygame.transform.scale(self.image, size_blue)
+            self.image = load_image('./images/blue.png', size_blue, alpha=True)
         elif char_type == 3:
-            self.image = pygame.image.load('./images/green.png').convert_alpha()
-            self.image = pygame.transform.scale(self.image, size_green)
+            self.image = load_image('./images/green.png', size_green, alpha=True)
         else:  # (기본값) 또는 선택 오류 시 기본 픽셀로 된 이미지
             self.image = pygame.Surface(size_default)
             self.image.fill(color)
@@ -78,8 +481,16 @@ class Player(pygame.sprite.Sprite):
         # 넉백 기능 추가하기=> 중력을 위한 속도 변수 추가
         self.vel_x = 0.0
         self.vel_y = 0.0
+        # 땅 위에 멈춰 있으면 잠들어서 물리 계산을 건너뛴다
+        # (넉백을 받거나, 움직이거나, 발밑에 크레이터가 생기면 깨어남)
+        self.asleep = False
+        self.sleep_ticks = 0
 
     def update(self, terrain):
+        if self.asleep:
+            self.sleep_ticks += 1
+            return
+
         # 넉백/관성으로 인한 x축 이동
         self.rect.x += int(self.vel_x)
 
@@ -97,18 +508,34 @@ class Player(pygame.sprite.Sprite):
             self.rect.y -= 1
             self.vel_y = 0  # 땅에 닿았으니 수직 속도를 리셋하기
 
-    def is_on_ground(self, terrain):
+        # 방금 땅에 닿아 멈췄고 바로 아래가 땅이면 잠들기
+        # (깨어 있어도 중력으로 1픽셀 내려갔다가 다시 올라오는 것을 반복할 뿐 위치는 그대로)
+        if self.vel_x == 0 and self.vel_y == 0 and self.is_on_ground(terrain, 1):
+            self.asleep = True
+            self.sleep_ticks = 0
+
+    def wake(self):
+        if not self.asleep:
+            return
+        self.asleep = False
+        # 깨어 있었다면 지금까지 중력으로 쌓였을 수직 속도를 되살린다 (결과가 안 잠든 경우와 같도록)
+        self.vel_y = 0.0
+        for _ in range(self.sleep_ticks % SETTLE_PERIOD):
+            self.vel_y += GRAVITY
+
+    def feet_point(self, below=0):
+        # 발밑 픽셀 좌표 (below: 몇 픽셀 아래를 볼지)
+        return self.rect.centerx, self.rect.bottom + self.y_offset + below
+
+    def is_on_ground(self, terrain, below=0):
         # 플레이어가 땅에 있는지 확인하기
         # 플레이어 발밑 타일 확인
         # y_offset = 0
-        feet_tile_x = self.rect.centerx // TILE_SIZE
-        feet_tile_y = (self.rect.bottom + self.y_offset) // TILE_SIZE
-        if 0 <= feet_tile_x < MAP_WIDTH and 0 <= feet_tile_y < MAP_HEIGHT:
-            return terrain.tiles[feet_tile_y][feet_tile_x] == 1
-        return False
+        return terrain.is_ground(*self.feet_point(below))
 
     # 좌우 이동 함수 만들기
     def move(self, dx, terrain):
+        self.wake()
         new_x = self.rect.x + dx
         
         # 화면 밖으로 나가지 않도록 입력하기
@@ -125,30 +552,62 @@ class Player(pygame.sprite.Sprite):
                 self.image = self.image_left
         
 
-    def draw_aim_indicator(self, surface):
-        # 현재 각도로 조준선 그리기
-        length = 50
+    def aim_line(self, length=50):
+        # 조준선의 시작점과 끝점 (현재 각도 기준)
         angle_rad = math.radians(self.angle if self.facing_right else 180 - self.angle)
         end_x = self.rect.centerx + length * math.cos(angle_rad)
         end_y = self.rect.centery - length * math.sin(angle_rad)
-        pygame.draw.line(surface, self.color, self.rect.center, (end_x, end_y), 3)
+        return self.rect.center, (end_x, end_y)
+
+    def draw_aim_indicator(self, surface, scale=1):
+        # 현재 각도로 조준선 그리기
+        (start_x, start_y), (end_x, end_y) = self.aim_line()
+        start = (start_x * scale, start_y * scale)
+        pygame.draw.line(surface, self.color, start, (end_x * scale, end_y * scale), max(1, round(3 * scale)))
 
     # 넉백 함수 추가하기(x,y 방향의 힘을 받도록 설정)
     def apply_knockback(self, kx, ky):
+        self.wake()
         self.vel_x += kx
         self.vel_y += ky
 
 
 # 지형 클래스 만들기
 class Terrain:
+    cell_size = TILE_SIZE # 충돌/파괴 단위 (픽셀)
+
     def __init__(self):
         # 2D 배열로 맵 표현 (0: 빈 공간, 1: 흙)
         self.tiles = [[0 for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
         self.map_theme = "default"
+        self.revision = 0 # 지형을 통째로 바꿀 때마다 증가 (새 맵, 스냅샷 복원)
+
+        # 스냅샷용: 맵 생성 직후의 원본 지형 + 그 이후 생긴 크레이터 목록
+        self.base_tiles = None
+        self.craters = []
+
+    def reset(self):
+        # 새 맵을 만들기 전에 빈 지형으로 되돌리기
+        self.tiles = [[0 for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+        self.revision += 1
+
+    def save_base(self):
+        # 맵 생성이 끝난 시점의 지형을 원본으로 저장하기
+        self.base_tiles = [row[:] for row in self.tiles]
+        self.craters = []
+
+    def restore_craters(self, craters):
+        """원본 지형에 크레이터 목록을 다시 적용해 지형을 복원합니다."""
+        if craters == self.craters:
+            return # 이미 같은 지형이면 다시 만들 필요 없음
+        self.tiles = [row[:] for row in self.base_tiles]
+        self.revision += 1
+        self.craters = []
+        for x, y, radius in craters:
+            self.destroy_terrain(x, y, radius)
 
     # 맵 1번: 평평한 맵
-    def create_map_1(self):
-        print("Loding Map 1: 평원")
+    def create_map_1(self, rng=random):
         self.map_theme = "plains"
         map_level = MAP_HEIGHT * 3 // 4
         terrain_thickness = 25  # 땅 두께 타일 개수
@@ -161,8 +620,7 @@ class Terrain:
                 self.tiles[y][x] = 1
 
 
-    def create_map_2(self):
-        print("Loding Map 2: 구룽지")
+    def create_map_2(self, rng=random):
         self.map_theme = "hills"
         map_level = MAP_HEIGHT * 3 // 4
         terrain_thickness = 25  # 땅 두께 설정
@@ -184,15 +642,14 @@ class Terrain:
                     is_platform_area = True
 
                 if is_platform_area:
-                    if random.random() < 0.3:
+                    if rng.random() < 0.3:
                         self.tiles[y][x] = 2
                     else:
                         self.tiles[y][x] = 1
                 else:
                     self.tiles[y][x] = 0
                 
-    def create_map_3(self):
-        print("Loding Map 3: 설원")
+    def create_map_3(self, rng=random):
         self.map_theme = "snow"
         base_level = MAP_HEIGHT * 3 // 4
         terrain_thickness = 25
@@ -220,31 +677,71 @@ class Terrain:
                     break
                 self.tiles[y][x] = 1
 
-    def draw(self, surface):
+    def clone(self):
+        # AI 시뮬레이션용 지형 복사본 (원본 지형 데이터는 공유)
+        terrain = Terrain.__new__(Terrain)
+        terrain.tiles = [row[:] for row in self.tiles]
+        terrain.map_theme = self.map_theme
+        terrain.revision = self.revision
+        terrain.base_tiles = self.base_tiles
+        terrain.craters = list(self.craters)
+        return terrain
+
+    def is_solid(self, x, y):
+        """픽셀 좌표 (x, y) 에 발사체가 부딪히는 지형(흙/바위)이 있는지"""
+        tile_x, tile_y = x // TILE_SIZE, y // TILE_SIZE
+        if 0 <= tile_x < MAP_WIDTH and 0 <= tile_y < MAP_HEIGHT:
+            return self.tiles[tile_y][tile_x] in (1, 2)
+        return False
+
+    def is_ground(self, x, y):
+        """픽셀 좌표 (x, y) 에 캐릭터가 딛고 설 수 있는 땅(흙)이 있는지"""
+        tile_x, tile_y = x // TILE_SIZE, y // TILE_SIZE
+        if 0 <= tile_x < MAP_WIDTH and 0 <= tile_y < MAP_HEIGHT:
+            return self.tiles[tile_y][tile_x] == 1
+        return False
+
+    def tile_color(self, tile):
+        # 맵 테마별 타일 색상
+        if self.map_theme == "plains":
+            return EARTH_GREEN
+        elif self.map_theme == "snow":
+            return SNOW_WHITE
+        elif self.map_theme == "hills":
+            return ROCK_GRAY_DARK if tile == 1 else ROCK_GRAY_LIGHT
+        # 기본 맵 (오류 시 회색)
+        return GRAY
+
+    def draw(self, surface, scale=1, area=None):
         # 지형 그리기
-        for y, row in enumerate(self.tiles):
-            for x, tile in enumerate(row):
-
-                if tile == 0:
-                    continue # 빈 공간은 그리지 않음
-
-                rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-
-                if self.map_theme == "plains":
-                    pygame.draw.rect(surface, EARTH_GREEN, rect)
-                elif self.map_theme == "snow":
-                    pygame.draw.rect(surface, SNOW_WHITE, rect)
-                elif self.map_theme == "hills":
-                    if tile == 1:
-                        pygame.draw.rect(surface, ROCK_GRAY_DARK, rect)
-                    elif tile == 2:
-                        pygame.draw.rect(surface, ROCK_GRAY_LIGHT, rect)
-                else:
-                    # 기본 맵 (오류 시 회색)
-                    pygame.draw.rect(surface, GRAY, rect)
+        # 같은 색 타일이 가로로 이어진 구간은 사각형 하나로 그린다.
+        # (scale: 내부 렌더링 해상도 배율, 타일 사이에 틈이 생기지 않도록 경계를 반올림)
+        # (area: 픽셀 단위 Rect 를 주면 그 영역에 걸친 타일만 다시 그린다)
+        if area is None:
+            left, top, right, bottom = 0, 0, MAP_WIDTH, MAP_HEIGHT
+        else:
+            left, top = area.left // TILE_SIZE, area.top // TILE_SIZE
+            right, bottom = -(-area.right // TILE_SIZE), -(-area.bottom // TILE_SIZE)
+        edges_x = [round(x * TILE_SIZE * scale) for x in range(MAP_WIDTH + 1)]
+        edges_y = [round(y * TILE_SIZE * scale) for y in range(MAP_HEIGHT + 1)]
+        colors = {tile: self.tile_color(tile) for tile in (1, 2)}
+        for y in range(top, bottom):
+            row_top = edges_y[y]
+            height = edges_y[y + 1] - row_top
+            for start, end, tile in tile_runs(self.tiles[y], left, right):
+                pygame.draw.rect(surface, colors[tile], (edges_x[start], row_top, edges_x[end] - edges_x[start], height))
+
+    def crater_rect(self, x, y, radius):
+        """크레이터가 지울 수 있는 영역 (픽셀 단위 Rect, 타일 경계에 맞춤, 맵 밖은 잘라냄)"""
+        tile_x, tile_y = x // TILE_SIZE, y // TILE_SIZE
+        tile_radius = radius // TILE_SIZE
+        area = pygame.Rect((tile_x - tile_radius) * TILE_SIZE, (tile_y - tile_radius) * TILE_SIZE,
+                           (tile_radius * 2 + 1) * TILE_SIZE, (tile_radius * 2 + 1) * TILE_SIZE)
+        return area.clip(pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
 
     def destroy_terrain(self, x, y, radius):
         # x, y 축의 지형을 파괴하기
+        self.craters.append((x, y, radius))
         tile_x, tile_y = x // TILE_SIZE, y // TILE_SIZE
         tile_radius = radius // TILE_SIZE
 
@@ -256,188 +753,684 @@ class Terrain:
                     if 0 <= check_x < MAP_WIDTH and 0 <= check_y < MAP_HEIGHT:
                         self.tiles[check_y][check_x] = 0
 
-# 발사체 클래스 만들기
-class Projectile(pygame.sprite.Sprite):
-    def __init__(self, x, y, angle, char_type, bonus_shot):
-        super().__init__()
+# 타일 한 줄에서 같은 값이 이어진 구간 (시작, 끝, 값) - 빈 공간(0)은 건너뜀
+def tile_runs(row, left=0, right=MAP_WIDTH):
+    run_start = left
+    for x in range(left + 1, right + 1):
+        if x < right and row[x] == row[run_start]:
+            continue
+        if row[run_start] != 0:
+            yield run_start, x, row[run_start]
+        run_start = x
+
+# 1픽셀 지형 클래스 (--pixel-terrain)
+# 맵 모양은 타일 지형과 같은 방법으로 만든 뒤 화면 크기의 비트마스크(pygame.mask)로 바꿔서 들고 있는다.
+# 크레이터는 원 모양 마스크로 지우고, 충돌/착지도 픽셀 단위로 확인한다.
+# 화면에는 미리 그려 둔 지형 Surface 를 그대로 붙이고, 크레이터 자리만 투명하게 지운다.
+class MaskTerrain(Terrain):
+    cell_size = 1
+    circle_masks = {} # 반지름 -> 원 모양 마스크 (모든 지형이 함께 씀)
 
-        if char_type == 1:
-            self.image = pygame.image.load('./images/투사체_불.png').convert_alpha()
-        elif char_type == 2:
-            self.image = pygame.image.load('./images/투사체_폭탄.png').convert_alpha()
-        elif char_type == 3:
-            self.image = pygame.image.load('./images/투사체_슬라임.png').convert_alpha()
-        else:
-            # 기본 발사체 이미지
-            self.image = pygame.Surface((5, 5))
-            self.image.fill(YELLOW)
-        
-        # 발사체 크기 수정
-        self.image = pygame.transform.scale(self.image, (60, 60))
-        self.rect = self.image.get_rect(center=(x, y))
-        
-        self.x = float(x)
-        self.y = float(y)
-        self.angle_rad = math.radians(angle)
-        
-        self.vel_x = PROJECTILE_VELOCITY * math.cos(self.angle_rad)
-        self.vel_y = -PROJECTILE_VELOCITY * math.sin(self.angle_rad)
-        
-        self.char_type = char_type
-        self.bonus_shot = bonus_shot
-        self.particles = [] # 궤적용
-        self.hit = False
-
-        # (추가) 그린 스킬을 위한 변수
-        self.split_done = False         # 분리가 완료되었는지
-        self.spawn_time = pygame.time.get_ticks()
-
-    def update(self, terrain, players):
-        new_projectiles = [] # (추가) 새로 생성될 발사체를 담을 리스트
-
-        if not self.hit:
-            # (추가) 그린 스킬 - 정점에서 분리 로직
-            if self.char_type == 3 and self.bonus_shot and not self.split_done:
-                split_delay = 700 # 몇 초 후에 분리 되는지 설정
-                current_time = pygame.time.get_ticks()
-
-                # 1. 포물선의 정점(vel_y가 0을 지날 때)인지 확인
-                if current_time - self.spawn_time > split_delay:
-                    print("그린 스킬 발동!")
-                    self.split_done = True # 한 번만 분리되도록
-
-                    # 2. 3개의 새로운 '자식' 발사체 생성
-                    # (char_type은 3, bonus_shot은 False로 줘서 자식이 또 분리되지 않게 함)
-                    p1 = Projectile(self.x, self.y, 0, 3, False)
-                    p1.vel_x = self.vel_x -1   # 좌측
-                    p1.vel_y = self.vel_y  
-                    p1.split_done = True        # 자식은 분리 안 함
-
-                    p2 = Projectile(self.x, self.y, 0, 3, False)
-                    p2.vel_x = self.vel_x       # 중앙
-                    p2.vel_y = self.vel_y       # 더 위로 (가운데가 높이)
-                    p2.split_done = True
-                    
-                    p3 = Projectile(self.x, self.y, 0, 3, False)
-                    p3.vel_x = self.vel_x + 1   # 우측
-                    p3.vel_y = self.vel_y   
-                    p3.split_done = True
-
-                    new_projectiles.extend([p1, p2, p3])
-
-                    # 3. 원본(부모) 발사체는 제거
-                    self.kill() 
-                    return new_projectiles # 새 발사체 리스트를 반환하고 즉시 종료
-            # --- (그린 스킬 로직 끝) ---
-
-            self.vel_y += GRAVITY
-            self.x += self.vel_x
-            self.y += self.vel_y
-            self.rect.center = (round(self.x), round(self.y))
-            
-            self.particles.append(self.rect.center)
-            if len(self.particles) > 50:
-                self.particles.pop(0)
+    def __init__(self):
+        super().__init__()
+        self.solid_mask = None  # 발사체가 부딪히는 곳 (타일 1, 2)
+        self.ground_mask = None # 캐릭터가 딛고 서는 곳 (타일 1)
+        self.surface = None     # 화면에 붙일 지형 그림 (크레이터는 투명하게 지움)
+        self.base_solid = self.base_ground = self.base_surface = None
+        self.scaled = None      # (배율, revision, 크레이터 수), 줄인 그림 - 내부 렌더링 해상도용
+
+    def save_base(self):
+        # 타일로 만든 맵을 픽셀 마스크와 그림으로 바꿔서 원본으로 저장하기
+        size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.base_surface = pygame.Surface(size, pygame.SRCALPHA)
+        Terrain.draw(self, self.base_surface)
+        self.base_solid = pygame.Mask(size)
+        self.base_ground = pygame.Mask(size)
+        for y, row in enumerate(self.tiles):
+            for start, end, tile in tile_runs(row):
+                block = pygame.Mask(((end - start) * TILE_SIZE, TILE_SIZE), fill=True)
+                self.base_solid.draw(block, (start * TILE_SIZE, y * TILE_SIZE))
+                if tile == 1:
+                    self.base_ground.draw(block, (start * TILE_SIZE, y * TILE_SIZE))
+        self.tiles = None # 타일 격자는 맵을 만들 때만 쓴다
+        self.base_tiles = None
+        self.craters = []
+        self.reset_to_base()
+
+    def reset_to_base(self):
+        self.solid_mask = self.base_solid.copy()
+        self.ground_mask = self.base_ground.copy()
+        self.surface = self.base_surface.copy()
+        self.revision += 1
+
+    def restore_craters(self, craters):
+        """원본 지형에 크레이터 목록을 다시 적용해 지형을 복원합니다."""
+        if craters == self.craters:
+            return # 이미 같은 지형이면 다시 만들 필요 없음
+        self.reset_to_base()
+        self.craters = []
+        for x, y, radius in craters:
+            self.destroy_terrain(x, y, radius)
+
+    def clone(self):
+        # AI 시뮬레이션용 지형 복사본 (충돌 마스크만 복사, 그림은 만들지 않음)
+        terrain = MaskTerrain.__new__(MaskTerrain)
+        terrain.tiles = terrain.base_tiles = None
+        terrain.map_theme = self.map_theme
+        terrain.revision = self.revision
+        terrain.craters = list(self.craters)
+        terrain.solid_mask = self.solid_mask.copy()
+        terrain.ground_mask = self.ground_mask.copy()
+        terrain.surface = None
+        terrain.base_solid, terrain.base_ground, terrain.base_surface = self.base_solid, self.base_ground, self.base_surface
+        terrain.scaled = None
+        return terrain
+
+    def is_solid(self, x, y):
+        if 0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT:
+            return self.solid_mask.get_at((x, y)) == 1
+        return False
 
-            # 지형 충돌 확인
-            tile_x = self.rect.centerx // TILE_SIZE
-            tile_y = self.rect.centery // TILE_SIZE
-            
-            if 0 <= tile_x < MAP_WIDTH and 0 <= tile_y < MAP_HEIGHT:
-                if terrain.tiles[tile_y][tile_x] in (1, 2):
-                    self.hit = True
-                    self.explode(terrain, players)
-                    return new_projectiles
+    def is_ground(self, x, y):
+        if 0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT:
+            return self.ground_mask.get_at((x, y)) == 1
+        return False
 
-            # 화면 밖으로 나감 (낙사 아님, 그냥 소멸)
-            if not (0 <= self.rect.centerx <= SCREEN_WIDTH and 0 <= self.rect.centery <= SCREEN_HEIGHT * 2):
-                self.kill() # 스프라이트 그룹에서 제거
+    def draw(self, surface, scale=1, area=None):
+        if scale == 1:
+            if area is None:
+                surface.blit(self.surface, (0, 0))
+            else:
+                surface.blit(self.surface, area, area)
+            return
+        # 내부 렌더링 해상도: 줄인 그림은 지형이 바뀔 때만 다시 만든다
+        key = (scale, self.revision, len(self.craters))
+        if self.scaled is None or self.scaled[0] != key:
+            size = (round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale))
+            self.scaled = (key, pygame.transform.smoothscale(self.surface, size))
+        surface.blit(self.scaled[1], (0, 0))
+
+    @classmethod
+    def circle_mask(cls, radius):
+        # pygame.draw.circle 과 같은 픽셀을 덮는 원 마스크 (그림과 충돌 마스크가 어긋나지 않도록)
+        if radius not in cls.circle_masks:
+            circle = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(circle, WHITE, (radius, radius), radius)
+            cls.circle_masks[radius] = pygame.mask.from_surface(circle)
+        return cls.circle_masks[radius]
+
+    def crater_rect(self, x, y, radius):
+        """크레이터가 지울 수 있는 영역 (픽셀 단위 Rect, 맵 밖은 잘라냄)"""
+        area = pygame.Rect(x - radius, y - radius, radius * 2 + 1, radius * 2 + 1)
+        return area.clip(pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
 
-        return new_projectiles
+    def destroy_terrain(self, x, y, radius):
+        # 원 모양 마스크로 지형 지우기
+        self.craters.append((x, y, radius))
+        circle = self.circle_mask(radius)
+        self.solid_mask.erase(circle, (x - radius, y - radius))
+        self.ground_mask.erase(circle, (x - radius, y - radius))
+        if self.surface is not None:
+            pygame.draw.circle(self.surface, (0, 0, 0, 0), (x, y), radius)
+
+# 폭발 반경 구하기
+def explosion_radius(char_type, bonus_shot):
+    radius = 40 # 기본 반경
+
+    # 캐릭터 2 (광역 폭발)
+    if char_type == 2 and bonus_shot:
+        radius = 70
+
+    # 캐릭터 3 (3발 분산)은 반경 변화 없음
+    return radius
+
+# 폭발 중심에서 플레이어 중심까지의 넉백 (kx, ky) 구하기 (범위 밖이면 None)
+def compute_knockback(explosion_x, explosion_y, radius, center):
+    knockback_radius = radius * 2  # 넉백 범위
+    max_knockback_force = 8        # 최대 넉백 힘
+
+    # 1. 플레이어와 폭발 중심 사이의 거리 계산
+    dist_x = center[0] - explosion_x
+    dist_y = center[1] - explosion_y
+    distance = math.sqrt(dist_x**2 + dist_y**2)
+
+    # 2. 넉백 범위 내에 있는지 확인 (0보다 커야 함)
+    if not 0 < distance < knockback_radius:
+        return None
 
-    # 지형 파괴 속성 함수 만들기
-    def explode(self, terrain, players):
-        radius = 40 # 기본 반경
-        
-        # 캐릭터 2 (광역 폭발)
-        if self.char_type == 2 and self.bonus_shot:
-            radius = 70
-        
-        # 캐릭터 3 (3발 분산)
-        if self.char_type == 3 and self.bonus_shot:
-            pass
-        
-        terrain.destroy_terrain(self.rect.centerx, self.rect.centery, radius)
+    # 3. 넉백 힘 계산 (거리에 반비례)
+    force_magnitude = max_knockback_force * (1 - (distance / knockback_radius))
+
+    # 4. 넉백 방향 (폭발 중심에서 플레이어 방향)
+    knock_x = (dist_x / distance) * force_magnitude
+    knock_y = (dist_y / distance) * force_magnitude
+
+    # 5. (게임성 보정) Y축 넉백은 항상 위로 띄우기
+    #    (아래로 박히는 넉백은 불쾌한 경험을 줄 수 있음)
+    if knock_y > 0: # 아래로 향하는 넉백이라면
+        knock_y = -knock_y * 0.2 # 방향을 바꿔 약하게 위로 띄움
+
+    # 6. (게임성 보정) 최소한의 수직 넉백을 보장 (위로 붕 뜨는 느낌)
+    knock_y -= force_magnitude * 0.1
+    return knock_x, knock_y
+
+# 발사체 한 발의 궤적을 시뮬레이션하기 (ProjectileBatch.update 와 같은 물리)
+# 반환값: ('hit' | 'out' | 'split', x, y, vel_x, vel_y)
+def trace_shot(terrain, x, y, vel_x, vel_y, max_frames=600, split_frame=None, points=None):
+    is_solid = terrain.is_solid
+    for frame in range(max_frames):
+        if frame == split_frame:
+            return 'split', x, y, vel_x, vel_y
+
+        vel_y += GRAVITY
+        x += vel_x
+        y += vel_y
+        center_x, center_y = round(x), round(y)
+        if points is not None:
+            points.append((center_x, center_y))
+
+        if is_solid(center_x, center_y):
+            return 'hit', center_x, center_y, vel_x, vel_y
+
+        if not (0 <= center_x <= SCREEN_WIDTH and 0 <= center_y <= SCREEN_HEIGHT * 2):
+            break
+    return 'out', x, y, vel_x, vel_y
+
+# 한 번의 발사(스킬 포함)를 시뮬레이션해서 폭발 목록 [(x, y, radius), ...] 을 돌려주기
+# (terrain 에 크레이터가 적용되므로 복사본을 넘겨야 함)
+def simulate_shot(terrain, x, y, angle, char_type, bonus_shot):
+    angle_rad = math.radians(angle)
+    vel_x = PROJECTILE_VELOCITY * math.cos(angle_rad)
+    vel_y = -PROJECTILE_VELOCITY * math.sin(angle_rad)
+    radius = explosion_radius(char_type, bonus_shot)
+
+    # 레드 스킬은 같은 각도로 3발, 그린 스킬은 일정 시간 뒤 3갈래로 분리
+    shots = 3 if char_type == 1 and bonus_shot else 1
+    split_frame = int(GREEN_SPLIT_DELAY / (1000 / FPS)) + 1 if char_type == 3 and bonus_shot else None
+
+    impacts = []
+    for _ in range(shots):
+        result = trace_shot(terrain, float(x), float(y), vel_x, vel_y, split_frame=split_frame)
+        if result[0] == 'split':
+            _, split_x, split_y, split_vel_x, split_vel_y = result
+            flights = [trace_shot(terrain, split_x, split_y, split_vel_x + dx, split_vel_y)
+                       for dx in (-1, 0, 1)]
+        else:
+            flights = [result]
+
+        for kind, hit_x, hit_y, _, _ in flights:
+            if kind == 'hit':
+                terrain.destroy_terrain(hit_x, hit_y, radius)
+                impacts.append((hit_x, hit_y, radius))
+    return impacts
+
+# 캐릭터 타입별 발사체 이미지 (발사/스냅샷 복원 때마다 새로 만들지 않도록 캐시)
+_projectile_images = {}
+
+def projectile_image(char_type):
+    if char_type in _projectile_images:
+        return _projectile_images[char_type]
+
+    # 발사체 크기 수정 (60, 60)
+    if char_type == 1:
+        image = load_image('./images/투사체_불.png', (60, 60), alpha=True)
+    elif char_type == 2:
+        image = load_image('./images/투사체_폭탄.png', (60, 60), alpha=True)
+    elif char_type == 3:
+        image = load_image('./images/투사체_슬라임.png', (60, 60), alpha=True)
+    else:
+        # 기본 발사체 이미지
+        image = pygame.Surface((5, 5))
+        image.fill(YELLOW)
+        image = pygame.transform.scale(image, (60, 60))
+    _projectile_images[char_type] = image
+    return image
+
+# 발사체 묶음 클래스 만들기
+# 발사체마다 스프라이트를 만드는 대신, 위치/속도/주인/타입/분리 타이머를 평행 배열로 들고
+# 모든 발사체를 한 번에 이동 -> 충돌 -> 분리 처리한다.
+class ProjectileBatch:
+    TRAIL_LENGTH = 50 # 궤적 점 개수
 
-        # --- (넉백 로직 추가) ---
-        knockback_radius = radius * 2  # 넉백 범위
-        max_knockback_force = 8        # 최대 넉백 힘
-        
-        explosion_x, explosion_y = self.rect.center
+    def __init__(self):
+        self.x = []
+        self.y = []
+        self.vel_x = []
+        self.vel_y = []
+        self.owner = []       # 발사한 플레이어 번호
+        self.char_type = []
+        self.bonus_shot = []
+        self.split_done = []
+        self.spawn_time = []
+        self.trails = []      # 궤적용 (최근 TRAIL_LENGTH 개 위치)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y, vel_x, vel_y, owner, char_type, bonus_shot, split_done, spawn_time):
+        self.x.append(float(x))
+        self.y.append(float(y))
+        self.vel_x.append(vel_x)
+        self.vel_y.append(vel_y)
+        self.owner.append(owner)
+        self.char_type.append(char_type)
+        self.bonus_shot.append(bonus_shot)
+        self.split_done.append(split_done)
+        self.spawn_time.append(spawn_time)
+        self.trails.append(deque(maxlen=self.TRAIL_LENGTH))
+
+    def spawn(self, x, y, angle, owner, char_type, bonus_shot, now):
+        """각도로 새 발사체를 추가합니다."""
+        angle_rad = math.radians(angle)
+        self.add(x, y, PROJECTILE_VELOCITY * math.cos(angle_rad), -PROJECTILE_VELOCITY * math.sin(angle_rad),
+                 owner, char_type, bonus_shot, False, now)
+
+    def clear(self):
+        for column in (self.x, self.y, self.vel_x, self.vel_y, self.owner, self.char_type,
+                       self.bonus_shot, self.split_done, self.spawn_time, self.trails):
+            column.clear()
+
+    def keep(self, alive):
+        # 살아있는 발사체만 남기기
+        for name in ('x', 'y', 'vel_x', 'vel_y', 'owner', 'char_type',
+                     'bonus_shot', 'split_done', 'spawn_time', 'trails'):
+            column = getattr(self, name)
+            column[:] = [value for value, keep in zip(column, alive) if keep]
+
+    def update(self, terrain, players, now):
+        count = len(self.x)
+        events = [] # ('split' | 'impact', 주인, x, y)
+        if count == 0:
+            return events
+        alive = [True] * count
+        moving = [True] * count
+        fragments = [] # 이번 프레임에 분리된 그린 파편 (다음 프레임부터 움직임)
+
+        # 1. 그린 스킬 - 시간이 지난 발사체는 이동하지 않고 3갈래로 분리
+        for i in range(count):
+            if (self.char_type[i] == 3 and self.bonus_shot[i] and not self.split_done[i]
+                    and now - self.spawn_time[i] > GREEN_SPLIT_DELAY):
+                events.append(('split', self.owner[i], round(self.x[i]), round(self.y[i])))
+                for dx in (-1, 0, 1): # 좌측, 중앙, 우측 (자식은 분리 안 함)
+                    fragments.append((self.x[i], self.y[i], self.vel_x[i] + dx, self.vel_y[i],
+                                      self.owner[i], 3, False, True, now))
+                alive[i] = False
+                moving[i] = False
+
+        # 2. 중력 + 이동을 한 번에
+        self.vel_y = [vy + GRAVITY if m else vy for vy, m in zip(self.vel_y, moving)]
+        self.x = [x + vx if m else x for x, vx, m in zip(self.x, self.vel_x, moving)]
+        self.y = [y + vy if m else y for y, vy, m in zip(self.y, self.vel_y, moving)]
+        centers = [(round(x), round(y)) for x, y in zip(self.x, self.y)]
+
+        # 3. 지형 충돌 / 화면 밖 확인 (폭발이 지형을 바꾸므로 순서대로)
+        is_solid = terrain.is_solid
+        for i in range(count):
+            if not moving[i]:
+                continue
+            center_x, center_y = centers[i]
+            self.trails[i].append(centers[i])
+
+            if is_solid(center_x, center_y):
+                self.explode(i, center_x, center_y, terrain, players)
+                events.append(('impact', self.owner[i], center_x, center_y))
+                alive[i] = False
+            elif not (0 <= center_x <= SCREEN_WIDTH and 0 <= center_y <= SCREEN_HEIGHT * 2):
+                alive[i] = False # 화면 밖으로 나감 (낙사 아님, 그냥 소멸)
+
+        # 4. 제거 + 새 파편 추가
+        if not all(alive):
+            self.keep(alive)
+        for fragment in fragments:
+            self.add(*fragment)
+        return events
+
+    def explode(self, i, center_x, center_y, terrain, players):
+        radius = explosion_radius(self.char_type[i], self.bonus_shot[i])
+        terrain.destroy_terrain(center_x, center_y, radius)
 
         for player in players:
-            # 1. 플레이어와 폭발 중심 사이의 거리 계산
-            dist_x = player.rect.centerx - explosion_x
-            dist_y = player.rect.centery - explosion_y
-            distance = math.sqrt(dist_x**2 + dist_y**2)
-
-            # 2. 넉백 범위 내에 있는지 확인 (0보다 커야 함)
-            if 0 < distance < knockback_radius:
-                # 3. 넉백 힘 계산 (거리에 반비례)
-                force_magnitude = max_knockback_force * (1 - (distance / knockback_radius))
-                
-                # 4. 넉백 방향 (폭발 중심에서 플레이어 방향)
-                knock_x = (dist_x / distance) * force_magnitude
-                knock_y = (dist_y / distance) * force_magnitude
-                
-                # 5. (게임성 보정) Y축 넉백은 항상 위로 띄우기
-                #    (아래로 박히는 넉백은 불쾌한 경험을 줄 수 있음)
-                if knock_y > 0: # 아래로 향하는 넉백이라면
-                    knock_y = -knock_y * 0.2 # 방향을 바꿔 약하게 위로 띄움
-                
-                # 6. (게임성 보정) 최소한의 수직 넉백을 보장 (위로 붕 뜨는 느낌)
-                knock_y -= force_magnitude * 0.1
+            knockback = compute_knockback(center_x, center_y, radius, player.rect.center)
+            if knockback:
+                player.apply_knockback(*knockback)
+
+    def draw(self, surface, scale=1, scaled_image=None):
+        for x, y, char_type, trail in zip(self.x, self.y, self.char_type, self.trails):
+            # 궤적 그리기
+            for point_x, point_y in trail:
+                pygame.draw.circle(surface, YELLOW, (round(point_x * scale), round(point_y * scale)), 1)
+            image = projectile_image(char_type)
+            if scaled_image:
+                image = scaled_image(image, scale)
+            surface.blit(image, image.get_rect(center=(round(x * scale), round(y * scale))))
+
+# AI 시뮬레이션용 가벼운 플레이어 복제본 (이미지 없이 물리만 계산)
+class BodyGhost:
+    update = Player.update
+    feet_point = Player.feet_point
+    is_on_ground = Player.is_on_ground
+    wake = Player.wake
+    apply_knockback = Player.apply_knockback
+
+    def __init__(self, player, center=None):
+        self.rect = player.rect.copy()
+        if center:
+            self.rect.center = center
+        self.y_offset = player.y_offset
+        self.vel_x = player.vel_x
+        self.vel_y = player.vel_y
+        self.asleep = player.asleep
+        self.sleep_ticks = player.sleep_ticks
+        self.wake() # 지형이 파였을 수 있으니 깨어 있는 상태로 시작 (수직 속도는 안 잠든 경우와 같게)
+
+# AI 플래너: 이동 위치 x 발사 각도 x 스킬 사용 여부 후보를 복사한 지형 위에서 시뮬레이션하고
+# 가장 좋은 후보를 고른다. 매 프레임 정해진 시간(frame_budget_ms)만큼만 조금씩 탐색하므로
+# 탐색 중에도 프레임이 밀리지 않고, 언제든 지금까지의 최선(best)을 바로 쓸 수 있다.
+class AIPlanner:
+    MOVE_STEP = 30        # 이동 후보 간격 (px)
+    MOVE_RANGE = 150      # 좌우 최대 이동 거리 (px)
+    OUTCOME_FRAMES = 150  # 넉백 이후 낙사 여부를 지켜볼 프레임 수
+
+    def __init__(self, terrain, player, opponent, difficulty='normal'):
+        self.terrain = terrain
+        self.player = player
+        self.opponent = opponent
+        self.settings = AI_DIFFICULTY[difficulty]
+
+        self.evaluations = 0
+        self.max_evaluations = self.settings['max_evaluations']
+        self.done = False
+        self.normal_scores = {} # (이동 위치, 각도) -> 일반 발사 점수
+
+        self.stand_points = self.find_stand_points()
+
+        # 탐색 전 기본값: 상대를 향한 직선 각도 (예전 AI 방식)
+        dx = opponent.rect.centerx - player.rect.centerx
+        dy = opponent.rect.centery - player.rect.centery
+        base_angle = math.degrees(math.atan2(-dy, dx))
+        if base_angle < 0: # 상대가 더 낮으면 낮게 쏘기
+            base_angle = 5 if base_angle > -90 else 175
+        base_angle = max(5, min(base_angle, 175))
+        self.best = (player.rect.centerx, base_angle, False)
+        self.best_score = -math.inf
+
+        self.candidates = self.generate_candidates()
+
+    def find_stand_points(self):
+        """이동 후보 위치별로 서 있게 될 중심 좌표를 구합니다. (중간에 구멍이 있으면 제외)"""
+        rect = self.player.rect
+        points = {rect.centerx: rect.center}
+        feet_y = rect.bottom + self.player.y_offset
+
+        for direction in (-1, 1):
+            for distance in range(self.MOVE_STEP, self.MOVE_RANGE + 1, self.MOVE_STEP):
+                target_x = rect.centerx + direction * distance
+                if target_x - rect.width // 2 < 0 or target_x + rect.width // 2 > SCREEN_WIDTH:
+                    break
+                ground_y = None
+                # 가는 길의 모든 열에 발판이 있어야 함
+                for x in range(rect.centerx, target_x + direction, direction * TILE_SIZE):
+                    ground_y = self.ground_y(x, feet_y)
+                    if ground_y is None:
+                        break
+                if ground_y is None:
+                    break
+                bottom = ground_y - 1 - self.player.y_offset
+                points[target_x] = (target_x, bottom - rect.height // 2)
+        return points
+
+    def ground_y(self, x, feet_y, reach=10 * TILE_SIZE):
+        # 발 높이 근처(위아래 reach 픽셀)에서 가장 위에 있는 땅 칸의 윗변 y 찾기
+        cell = self.terrain.cell_size
+        feet_cell, reach_cells = feet_y // cell, reach // cell
+        for cell_y in range(max(0, feet_cell - reach_cells), min(SCREEN_HEIGHT // cell, feet_cell + reach_cells)):
+            if self.terrain.is_ground(x, cell_y * cell):
+                return cell_y * cell
+        return None
 
-                # 7. 플레이어에게 넉백 적용
-                player.apply_knockback(knock_x, knock_y)
-        # --- (넉백 로직 끝) ---
-        
-        self.kill() # 충돌 후 제거
+    def generate_candidates(self):
+        # 1단계: 가까운 위치부터 10도 간격 각도, 일반/스킬 발사
+        for move_x in sorted(self.stand_points, key=lambda x: abs(x - self.player.rect.centerx)):
+            for angle in range(5, 180, 10):
+                yield move_x, angle, False
+                yield move_x, angle, True
+
+        # 2단계: 지금까지의 최선 후보 주변 각도를 1도 간격으로 세밀하게
+        yield from self.refine_candidates()
+
+    def refine_candidates(self):
+        move_x, angle, bonus = self.best
+        for delta in (-4, -3, -2, -1, 1, 2, 3, 4):
+            yield move_x, max(1, min(angle + delta, 179)), bonus
+
+    def refine_from(self, center):
+        """실제로 도착한 위치에서 최선 각도 주변을 다시 탐색합니다."""
+        self.stand_points = {center[0]: center}
+        move_x, angle, bonus = self.best
+        self.best = (center[0], angle, bonus)
+        self.best_score = -math.inf
+        self.candidates = iter([self.best] + list(self.refine_candidates()))
+        self.done = False
+
+    def step(self, budget_ms=None):
+        """이번 프레임의 시간 예산만큼 후보를 평가합니다."""
+        if budget_ms is None:
+            budget_ms = self.settings['frame_budget_ms']
+        deadline = time.perf_counter() + budget_ms / 1000
+        while not self.done and time.perf_counter() < deadline:
+            candidate = next(self.candidates, None)
+            if candidate is None:
+                self.done = True
+                break
 
-    def draw(self, surface):
-        # 궤적 그리기
-        for point in self.particles:
-            pygame.draw.circle(surface, YELLOW, point, 1)
-        surface.blit(self.image, self.rect)
+            score = self.evaluate(*candidate)
+            self.evaluations += 1
+            if score > self.best_score:
+                self.best_score = score
+                self.best = candidate
+            if self.evaluations >= self.max_evaluations:
+                self.done = True
+        return self.best
+
+    def evaluate(self, move_x, angle, bonus):
+        if not bonus:
+            score = self.simulate(move_x, angle, False)
+            self.normal_scores[(move_x, angle)] = score
+            return score
+
+        # 스킬은 게이지 성공 확률만큼만 기대할 수 있음 (실패하면 일반 발사)
+        if (move_x, angle) not in self.normal_scores:
+            self.normal_scores[(move_x, angle)] = self.simulate(move_x, angle, False)
+        chance = self.settings['skill_chance']
+        return chance * self.simulate(move_x, angle, True) + (1 - chance) * self.normal_scores[(move_x, angle)]
+
+    def simulate(self, move_x, angle, bonus):
+        start = self.stand_points[move_x]
+        terrain = self.terrain.clone()
+        impacts = simulate_shot(terrain, start[0], start[1], angle, self.player.char_type, bonus)
+        if not impacts:
+            return -2000 # 맵 밖으로 날아가는 샷
+
+        target = BodyGhost(self.opponent)
+        me = BodyGhost(self.player, start)
+        in_reach = False
+        closest = math.inf
+        for hit_x, hit_y, radius in impacts:
+            closest = min(closest, math.hypot(hit_x - target.rect.centerx, hit_y - target.rect.centery))
+            for body in (target, me):
+                if math.hypot(hit_x - body.rect.centerx, hit_y - body.rect.centery) < radius * 3:
+                    in_reach = True
+                knockback = compute_knockback(hit_x, hit_y, radius, body.rect.center)
+                if knockback:
+                    body.apply_knockback(*knockback)
+
+        score = -closest
+        score += 30 * math.hypot(target.vel_x, target.vel_y)
+
+        # 폭발이 가까우면 넉백 + 파인 지형 이후 결과(낙사)까지 시뮬레이션
+        if in_reach:
+            for _ in range(self.OUTCOME_FRAMES):
+                target.update(terrain)
+                me.update(terrain)
+                if target.asleep and me.asleep:
+                    break # 둘 다 멈췄으면 더 볼 필요 없음
+            if target.rect.top > SCREEN_HEIGHT:
+                score += 2000
+            if me.rect.top > SCREEN_HEIGHT:
+                score -= 3000
+        return score
+
+# 조준 미리보기 설정
+AIM_PREVIEW_STEP = 0.5        # 궤적 표의 각도 간격 (도)
+AIM_PREVIEW_BUDGET_MS = 1.0   # 프레임당 궤적 표를 채우는 시간
+AIM_PREVIEW_DOT_SPACING = 4   # 점선 간격 (궤적의 몇 프레임마다 점 하나)
+
+# 조준 미리보기: 지금 각도로 쏘면 날아갈 궤적을 첫 지형 충돌 지점까지 점선으로 보여준다.
+# AIM_1 이 시작되면 현재 위치에서 0.5도 간격 모든 각도의 궤적 표를 만들기 시작하고,
+# 매 프레임 정해진 시간만큼만 게이지가 지나갈 순서대로 채운다. (아직 없는 각도는 그 자리에서 하나만 계산)
+# 플레이어가 움직이면 표 전체를, 크레이터가 궤적 범위를 건드리면 그 각도만 다시 만든다.
+class AimPreview:
+    def __init__(self, terrain, player, sweep_direction=1):
+        self.terrain = terrain
+        self.player = player
+        self.origin = player.rect.center
+        self.facing_right = player.facing_right
+        self.paths = [None] * (int(180 / AIM_PREVIEW_STEP) + 1) # 각도 칸 -> (점선 점 목록, 궤적 범위 Rect)
+        self.terrain_revision = terrain.revision
+        self.craters_seen = len(terrain.craters)
+        self.traced = 0 # 궤적을 계산한 횟수 (점검용)
+
+        # 게이지가 지나갈 순서: 현재 각도에서 움직이는 방향 끝까지, 그 다음 반대쪽
+        start = self.index(player.angle)
+        if sweep_direction >= 0:
+            self.order = list(range(start, len(self.paths))) + list(range(start - 1, -1, -1))
+        else:
+            self.order = list(range(start, -1, -1)) + list(range(start + 1, len(self.paths)))
+        self.cursor = 0
+
+    def valid(self, player):
+        """같은 플레이어가 같은 자리/방향에 있으면 True (아니면 표를 새로 만들어야 함)"""
+        return (player is self.player and player.rect.center == self.origin
+                and player.facing_right == self.facing_right)
+
+    def index(self, angle):
+        return max(0, min(len(self.paths) - 1, round(angle / AIM_PREVIEW_STEP)))
+
+    def sync_terrain(self):
+        # 지형이 통째로 바뀌었으면 전부, 새 크레이터가 생겼으면 그 범위를 지나는 궤적만 지운다
+        terrain = self.terrain
+        if terrain.revision != self.terrain_revision or len(terrain.craters) < self.craters_seen:
+            self.paths = [None] * len(self.paths)
+            self.cursor = 0
+        else:
+            for x, y, radius in terrain.craters[self.craters_seen:]:
+                area = terrain.crater_rect(x, y, radius)
+                for i, path in enumerate(self.paths):
+                    if path and path[1].colliderect(area):
+                        self.paths[i] = None
+                        self.cursor = 0
+        self.terrain_revision = terrain.revision
+        self.craters_seen = len(terrain.craters)
+
+    def trace(self, index):
+        angle = index * AIM_PREVIEW_STEP
+        angle_rad = math.radians(angle if self.facing_right else 180 - angle)
+        points = []
+        trace_shot(self.terrain, float(self.origin[0]), float(self.origin[1]),
+                   PROJECTILE_VELOCITY * math.cos(angle_rad), -PROJECTILE_VELOCITY * math.sin(angle_rad),
+                   points=points)
+        self.traced += 1
+        if not points:
+            self.paths[index] = ([], pygame.Rect(self.origin, (0, 0)))
+            return
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        bounds = pygame.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+        self.paths[index] = (points[AIM_PREVIEW_DOT_SPACING - 1::AIM_PREVIEW_DOT_SPACING], bounds)
+
+    def step(self, budget_ms=AIM_PREVIEW_BUDGET_MS):
+        """이번 프레임의 시간 예산만큼 궤적 표를 채웁니다."""
+        self.sync_terrain()
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.cursor < len(self.order) and time.perf_counter() < deadline:
+            index = self.order[self.cursor]
+            if self.paths[index] is None:
+                self.trace(index)
+            self.cursor += 1
+
+    def dots(self, angle):
+        """angle 로 쏘았을 때의 점선 점 목록"""
+        self.sync_terrain()
+        index = self.index(angle)
+        if self.paths[index] is None:
+            self.trace(index)
+        return self.paths[index][0]
 
 # 메인 게임 로직 클래스 설정
 class Game:
-    def __init__(self, surface, p1_type, p2_type, is_ai_p2):
+    def __init__(self, surface, p1_type, p2_type, is_ai_p2, ai_difficulty='normal', render_fps=FPS,
+                 event_log=None, is_ai_p1=False, render_scale=1.0, hud_full_res=True, renderer=None,
+                 input_latency=False, skill_timing='frame', pixel_terrain=False):
+        # surface 가 None 이면 화면 없이(헤드리스) 시뮬레이션만 한다 (매치 서버, 테스트용)
         self.surface = surface
+        self.headless = surface is None
+        self.renderer = renderer # TextureRenderer 를 주면 Surface 대신 텍스처로 그린다
+        self.event_log = event_log or default_event_log()
+        self.match_id = self.event_log.new_match()
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
+        if render_fps <= 0:
+            raise ValueError(f"render_fps 는 0보다 커야 합니다: {render_fps}")
+        self.render_fps = render_fps # 렌더링 FPS 상한 (배터리/관전 화면 등에서 낮춰서 사용)
+        # 프레임 하나에 돌릴 최대 틱 수 (FPS 가 낮아도 시뮬레이션이 느려지지 않도록 프레임당 틱 수보다 크게)
+        self.max_sim_steps = max(MAX_SIM_STEPS_PER_FRAME, math.ceil(SIM_HZ / render_fps) + 1)
+
+        # 내부 렌더링 해상도 배율 (예: 0.5 -> 640x360 에 그린 뒤 창 크기로 확대)
+        if not 0 < render_scale <= 1:
+            raise ValueError(f"render_scale 은 0보다 크고 1 이하여야 합니다: {render_scale}")
+        if renderer and render_scale != 1:
+            raise ValueError("텍스처 렌더러는 render_scale 과 함께 쓸 수 없습니다.")
+        self.render_scale = render_scale
+        self.hud_full_res = hud_full_res # HUD 는 확대 후 원래 해상도로 그릴지
+        self.scaled_images = {}
+        self.world_surface = None
+        if render_scale != 1 and not self.headless:
+            self.world_surface = pygame.Surface((round(SCREEN_WIDTH * render_scale),
+                                                 round(SCREEN_HEIGHT * render_scale))).convert()
+
+        # 보너스 게이지 판정 시점: 'frame' 은 처리할 때의 게이지 값, 'event' 는 키가 도착한 순간의 게이지 값
+        if skill_timing not in ('frame', 'event'):
+            raise ValueError(f"skill_timing 은 'frame' 또는 'event' 여야 합니다: {skill_timing}")
+        self.skill_timing = skill_timing
+        self.input_latency = InputLatency() if input_latency else None
+        self.event_queue = [] # (도착 시각, 이벤트) - 프레임을 기다리는 동안 모아 둔 입력
+
+        # 시뮬레이션 시계: 렌더링과 상관없이 틱마다 SIM_STEP_MS 씩 흐른다
+        self.sim_ticks = 0
+        self.sim_wall = None # 현재 시뮬레이션 상태가 나타내는 실제 시각 (perf_counter)
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.body_counts = (0, 0) # 이번 틱의 (잠든, 깨어 있는) 플레이어 수
+        self.body_ticks_asleep = 0
+        self.body_ticks_awake = 0
+        self.craters_seen = 0 # 잠든 플레이어를 깨울지 이미 확인한 크레이터 수
+        self.last_drawn_state = None
+        self.held_keys = None # 이번 프레임에 눌려 있는 키 (handle_events 에서 갱신)
+        self.font = None if self.headless else get_font(36)
+        self.restart_font = None if self.headless else get_font(30)
         
-        # 먼저 빈 지형 객체를 생성한다
-        self.terrain = Terrain()
+        # 먼저 빈 지형 객체를 생성한다 (pixel_terrain: 1픽셀 단위 비트마스크 지형)
+        self.terrain = MaskTerrain() if pixel_terrain else Terrain()
 
         # 랜덤으로 돌릴 맵들을 리스트로 저장하기
-        map_choices = [
-            {'bg': './images/평야배경.jpg', 'terrain_method': self.terrain.create_map_1},
-            {'bg': './images/우주하늘배경.jpg', 'terrain_method': self.terrain.create_map_2},
-            {'bg': './images/설원배경.jpg', 'terrain_method': self.terrain.create_map_3}
+        self.map_choices = [
+            {'name': '평원', 'bg': './images/평야배경.jpg', 'terrain_method': self.terrain.create_map_1},
+            {'name': '구룽지', 'bg': './images/우주하늘배경.jpg', 'terrain_method': self.terrain.create_map_2},
+            {'name': '설원', 'bg': './images/설원배경.jpg', 'terrain_method': self.terrain.create_map_3}
         ]
 
         # 저장한 리스트에 있는 맵들을 랜덤으로 선택하기
-        chosen_map = random.choice(map_choices)
-        # 선택된 맵의 배경 이미지를 로드하기
-        try:
-            self.background_image = pygame.image.load(chosen_map['bg']).convert()
-            self.background_image = pygame.transform.scale(self.background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-        except pygame.error as e:
-            print(f"Error!! {chosen_map['bg']} 배경 이미지를 불러오지 못했습니다. {e}")
-            self.background_image = None
-
-        chosen_map['terrain_method']()
+        # (스냅샷에서 같은 맵을 다시 만들 수 있도록 맵 번호와 시드를 기억해 둔다)
+        self.load_map(random.randrange(len(self.map_choices)), random.getrandbits(32))
 
         # 플레이어 생성 (컨트롤, 캐릭터 타입 지정)
         player_1_controls = {'left': pygame.K_a, 'right': pygame.K_d, 'fire': pygame.K_SPACE}
@@ -448,7 +1441,7 @@ class Game:
         self.player_list = [
             Player(SCREEN_WIDTH // 4, 
                    0,
-                   RED, player_1_controls, char_type=p1_type, is_ai=False),
+                   RED, player_1_controls, char_type=p1_type, is_ai=is_ai_p1),
             Player(SCREEN_WIDTH * 3 // 4, 
                    0,
                    BLUE, player_2_controls, char_type=p2_type, is_ai=is_ai_p2)
@@ -457,7 +1450,7 @@ class Game:
         for player in self.player_list:
             player.rect.top = 0
 
-        self.projectiles = pygame.sprite.Group()
+        self.projectiles = ProjectileBatch()
         
         self.turn_index = 0
         self.current_player = self.player_list[self.turn_index]
@@ -481,145 +1474,224 @@ class Game:
         self.multi_shot_angle = 0
 
         self.ai_timer = 0 # [!!!] (추가) AI의 "생각" 시간을 위한 타이머
+        self.ai_difficulty = ai_difficulty
+        self.ai_planner = None # AI 턴마다 새로 만드는 탐색기
+        self.aim_preview = None # 사람 플레이어 AIM_1 동안 쓰는 궤적 표
+        self.ai_frame_budget_ms = None # 프레임당 AI 탐색 시간 (None 이면 난이도 기본값)
+        self.winner = None
+
+    def load_map(self, map_index, map_seed):
+        self.map_index = map_index
+        self.map_seed = map_seed
+        chosen_map = self.map_choices[map_index]
+        self.log('info', 'map_load', map=map_index + 1, name=chosen_map['name'], seed=map_seed)
+        # 선택된 맵의 배경 이미지를 로드하기 (헤드리스는 배경 필요 없음)
+        self.background_image = None
+        if not self.headless:
+            try:
+                self.background_image = load_image(chosen_map['bg'], (SCREEN_WIDTH, SCREEN_HEIGHT))
+            except (pygame.error, OSError) as e:
+                self.log('warning', 'background_load_failed', path=chosen_map['bg'], error=str(e))
+
+        self.terrain.reset()
+        chosen_map['terrain_method'](random.Random(map_seed))
+        self.terrain.save_base()
+
+    def now(self):
+        # 시뮬레이션 시각 (ms)
+        return int(self.sim_ticks * SIM_STEP_MS)
+
+    def log(self, level, event, **fields):
+        # 이벤트 로그에 경기 번호와 시뮬레이션 틱을 붙여서 기록
+        self.event_log.log(level, event, match=self.match_id, tick=self.sim_ticks, **fields)
 
     def run(self):
+        lag = SIM_STEP_MS # 아직 시뮬레이션하지 못한 실제 시간 (ms), 첫 프레임은 한 틱 진행
+        self.clock.tick()
+        frame_start = time.perf_counter()
+        # 입력 도착 시각이 필요하면 프레임을 기다리는 동안에도 이벤트를 받아 둔다
+        poll_input = self.input_latency is not None or self.skill_timing == 'event'
         while True: # 게임 루프
             event_result = self.handle_events() # 이벤트 처리
             
-            if event_result == 'QUIT':
-                return 'QUIT' # 메인 루프에 '종료' 신호 전달
-            if event_result == 'RESTART':
-                return 'RESTART' # 메인 루프에 '재시작' 신호 전달
+            if event_result in ('QUIT', 'RESTART'):
+                self.log_frame_report()
+                return event_result # 메인 루프에 '종료' / '재시작' 신호 전달
+
+            # 고정 틱으로 시뮬레이션 (렌더링 FPS 와 상관없이 같은 속도로 진행)
+            steps = 0
+            while lag >= SIM_STEP_MS and steps < self.max_sim_steps:
+                self.update()
+                lag -= SIM_STEP_MS
+                steps += 1
+            if lag >= SIM_STEP_MS:
+                lag %= SIM_STEP_MS # 너무 밀렸으면 따라잡기 포기 (한 틱이 안 되는 남은 시간은 유지)
+            self.sim_wall = frame_start - lag / 1000
+            if steps and self.input_latency:
+                self.input_latency.simulated(time.perf_counter())
+
+            # 화면에 보이는 상태가 그대로면 그리지 않고 건너뛰기
+            visible_state = self.visible_state()
+            if visible_state != self.last_drawn_state:
+                self.draw()
+                self.last_drawn_state = visible_state
+                self.frames_rendered += 1
+            else:
+                self.frames_skipped += 1
+            if self.input_latency:
+                self.input_latency.presented(time.perf_counter())
+
+            if poll_input:
+                self.wait_for_frame(frame_start)
+            lag += self.clock.tick(self.render_fps)
+            frame_start = time.perf_counter()
+
+    def wait_for_frame(self, frame_start):
+        # 다음 프레임까지 1ms 씩 쉬면서 들어오는 이벤트에 도착 시각을 붙여 둔다
+        deadline = frame_start + 1 / self.render_fps - 0.001
+        while time.perf_counter() < deadline:
+            self.collect_events()
+            pygame.time.wait(1)
+
+    def collect_events(self):
+        arrival = time.perf_counter()
+        self.event_queue.extend((arrival, event) for event in pygame.event.get())
+
+    def gauge_value_after(self, ticks):
+        """보너스 게이지를 ticks 틱(소수 가능) 더 움직였을 때의 값 (update 의 게이지 이동과 같은 규칙)"""
+        value, direction = self.gauge_2_value, self.gauge_2_direction
+        ticks = max(0.0, min(ticks, self.max_sim_steps))
+        while ticks > 0:
+            step = min(1.0, ticks)
+            value += self.gauge_2_speed * direction * step
+            if value <= 0 or value >= self.gauge_2_height:
+                direction *= -1
+                value = max(0, min(value, self.gauge_2_height))
+            ticks -= step
+        return value
+
+    def visible_state(self):
+        """화면에 그려지는 내용을 결정하는 값들을 모읍니다. (이전 프레임과 같으면 다시 그릴 필요 없음)"""
+        if len(self.projectiles):
+            # 발사체는 매 틱 움직이므로 틱이 지날 때마다 다시 그림
+            # (None 을 돌려주면 last_drawn_state 의 초기값/노출 이벤트 표시와 같아져 다음 프레임부터 건너뛴다)
+            return ('FLYING', self.sim_ticks)
+
+        if self.game_state == "MOVE":
+            remaining = (self.move_time_limit - (self.now() - self.state_timer)) // 100
+        elif self.game_state == "AIM_2":
+            remaining = (self.aim_2_time_limit - (self.now() - self.state_timer)) // 100
+        else:
+            remaining = None
+
+        return (self.game_state, self.turn_index, remaining, round(self.current_player.angle),
+                self.gauge_2_value, self.gauge_2_target_value, len(self.terrain.craters),
+                tuple((player.rect.topleft, player.facing_right) for player in self.player_list))
+
+    def frame_report(self):
+        return {
+            'simulated': self.sim_ticks,
+            'rendered': self.frames_rendered,
+            'skipped': self.frames_skipped,
+            'bodies_asleep': self.body_ticks_asleep, # 플레이어 x 틱
+            'bodies_awake': self.body_ticks_awake,
+        }
+
+    def log_frame_report(self):
+        report = self.frame_report()
+        self.log('info', 'frame_report', **report)
+        if self.input_latency and self.input_latency.samples:
+            self.log('info', 'input_latency', states=self.input_latency.summary())
+
+    def handle_event(self, event, arrival=None):
+        """이벤트 하나를 처리합니다. (매치 서버는 키 입력을 이 함수로 직접 넣는다)
+        arrival: 이벤트가 도착한 시각 (perf_counter), skill_timing 이 'event' 일 때 게이지 판정에 사용"""
+        if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
+            return 'QUIT'
+
+        # 창이 가려졌다 다시 보이면 상태가 같아도 다시 그리기
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.last_drawn_state = None
+        
+        # 재시작 로직 추가하기 키보드 R키로 설정
+        if self.game_state == "GAMEOVER":
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                self.log('info', 'restart')
+                return 'RESTART'
+        
+        # AI가 아닐 때만 키 입력을 받음
+        if not self.current_player.is_ai:
+        
+            # [2. 조준 1단계 (각도) 상태]
+            if self.game_state == "AIM_1":
+                if event.type == pygame.KEYDOWN and event.key == self.current_player.controls['fire']:
+                    # 1단계 게이지 완료 -> 2단계로
+                    self.game_state = "AIM_2"
+                    self.state_timer = self.now() # 3초 타이머 시작
+                    self.gauge_2_value = 0
+                    self.gauge_2_direction = 1
+                    # 랜덤한 타겟 위치 설정 - 랜덤한 '타겟 값' (0 ~ 180)을 설정
+                    self.gauge_2_target_value = random.randint(0, self.gauge_2_height - self.gauge_2_target_height)
             
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+            # [3. 조준 2단계 (보너스) 상태]
+            elif self.game_state == "AIM_2":
+                if event.type == pygame.KEYDOWN and event.key == self.current_player.controls['fire']:
+                    # 2단계 게이지 발사!
+                    # (indicator 두께 5 / 2)
+                    gauge = self.gauge_2_value
+                    if self.skill_timing == 'event' and arrival is not None and self.sim_wall is not None:
+                        # 키가 도착한 순간까지 게이지가 더 움직인 만큼 반영
+                        gauge = self.gauge_value_after((arrival - self.sim_wall) * 1000 / SIM_STEP_MS)
+                    indicator_center = gauge + 2.5 
+                    target_top = self.gauge_2_target_value
+                    target_bottom = self.gauge_2_target_value + self.gauge_2_target_height
+
+                    self.bonus_shot = target_top <= indicator_center <= target_bottom
+                    self.log('info', 'gauge', player=self.turn_index + 1, bonus=self.bonus_shot,
+                             gauge=self.gauge_2_value, target=self.gauge_2_target_value,
+                             timing=self.skill_timing, judged=round(gauge, 2))
+                    
+                    self.fire_projectile()
+        return None
 
     def handle_events(self):
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT:
-                return 'QUIT'
-            
-            # 재시작 로직 추가하기 키보드 R키로 설정
-            if self.game_state == "GAMEOVER":
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                    print("재시작! 캐릭터 선택창으로 돌아갑니다...")
-                    return 'RESTART'
-            
-            # AI가 아닐 때만 키 입력을 받음
-            if not self.current_player.is_ai:
+        self.collect_events()
+        events, self.event_queue = self.event_queue, []
+        for arrival, event in events:
+            player = self.current_player
+            state = self.game_state
+            tracked = (self.input_latency is not None and event.type == pygame.KEYDOWN
+                       and not player.is_ai and event.key in player.controls.values())
+            result = self.handle_event(event, arrival)
+            if tracked:
+                # 상태가 바로 바뀐 입력(발사 키)은 지금 반영, 이동 키는 다음 틱에 반영
+                handled = time.perf_counter()
+                self.input_latency.handled(state, arrival, handled, handled if self.game_state != state else None)
+            if result:
+                return result
+
+        # 이동 키는 시뮬레이션 틱마다 적용 (update 에서 처리)
+        self.held_keys = pygame.key.get_pressed()
+
+        return None
             
-                # [2. 조준 1단계 (각도) 상태]
-                if self.game_state == "AIM_1":
-                    if event.type == pygame.KEYDOWN and event.key == self.current_player.controls['fire']:
-                        # 1단계 게이지 완료 -> 2단계로
-                        self.game_state = "AIM_2"
-                        self.state_timer = pygame.time.get_ticks() # 3초 타이머 시작
-                        self.gauge_2_value = 0
-                        self.gauge_2_direction = 1
-                        # 랜덤한 타겟 위치 설정 - 랜덤한 '타겟 값' (0 ~ 180)을 설정
-                        self.gauge_2_target_value = random.randint(0, self.gauge_2_height - self.gauge_2_target_height)
-                
-                # [3. 조준 2단계 (보너스) 상태]
-                elif self.game_state == "AIM_2":
-                    if event.type == pygame.KEYDOWN and event.key == self.current_player.controls['fire']:
-                        # 2단계 게이지 발사!
-                        # (indicator 두께 5 / 2)
-                        indicator_center = self.gauge_2_value + 2.5 
-                        target_top = self.gauge_2_target_value
-                        target_bottom = self.gauge_2_target_value + self.gauge_2_target_height
-
-                        if target_top <= indicator_center <= target_bottom:
-                            self.bonus_shot = True
-                            print("SKILL SHOT!")
-                        else:
-                            self.bonus_shot = False
-                            print("실패!")
-                        
-                        self.fire_projectile()
+# [Game 클래스 내부]
 
-        keys = pygame.key.get_pressed()
+    def update(self):
+        self.sim_ticks += 1
+        current_time = self.now()
 
-        if self.game_state == "MOVE" and not self.current_player.is_ai:
+        # 눌려 있는 이동 키 처리
+        keys = self.held_keys
+        if keys and self.game_state == "MOVE" and not self.current_player.is_ai:
             if keys[self.current_player.controls['left']]:
                 self.current_player.move(-1, self.terrain)
             if keys[self.current_player.controls['right']]:
                 self.current_player.move(1, self.terrain)
 
-        return None
-            
-# [Game 클래스 내부]
-
-    def update(self):
-        current_time = pygame.time.get_ticks()
-
         # AI의 "뇌" 로직
-        if self.current_player.is_ai and self.game_state != "FIRE":
-            
-            # AI가 "생각"하는 시간 (예: 1초)
-            if current_time - self.ai_timer > 1000: # 1초마다 한 번씩 결정
-
-                if self.game_state == "MOVE":
-                    print("AI: 이동 종료. 조준 시작.")
-                    self.game_state = "AIM_1"
-                    self.ai_timer = current_time # 타이머 리셋
-                
-                elif self.game_state == "AIM_1":
-                
-                    # 1. 목표(P1) 위치 확인
-                    human_player = self.player_list[0]
-                    target_x = human_player.rect.centerx
-                    target_y = human_player.rect.centery
-                    
-                    # 2. AI와 P1 사이의 거리(dx, dy) 계산
-                    dx = target_x - self.current_player.rect.centerx
-                    dy = target_y - self.current_player.rect.centery # (dy가 양수 = P1이 더 낮음)
-                    
-                    # 3. P1을 향한 '직선' 각도 계산 (라디안 -> 각도)
-                    # math.atan2는 (y, x) 순서. (y는 위로 갈수록 +여야 하므로 -dy 사용)
-                    base_angle_rad = math.atan2(-dy, dx) 
-                    base_angle_deg = math.degrees(base_angle_rad)
-
-                    # 4. 방향 설정 (atan2가 0~180, 0~-180 범위를 반환하므로 보정)
-                    if dx < 0: # P1이 왼쪽에 있을 때
-                        self.current_player.facing_right = False
-                        base_angle_deg = 180 - base_angle_deg # Pygame 각도(0~180)로 변환
-                    else: # P1이 오른쪽에 있을 때
-                        self.current_player.facing_right = True
-                        # (base_angle_deg는 0~90이므로 그대로 사용)
-
-                    # 5. [!!!] 명중률 설정 (오차 값) [!!!]
-                    # 중력을 무시한 각도에 '무작위 오차'를 더해 명중률 조절
-                    # (숫자가 클수록 AI가 더 부정확하게 쏩니다)
-                    ACCURACY_ERROR_DEGREES = 15 # (예: -15 ~ +15도 오차)
-                    
-                    ai_angle = base_angle_deg + random.randint(-ACCURACY_ERROR_DEGREES, ACCURACY_ERROR_DEGREES)
-                    
-                    # 각도가 0~180을 벗어나지 않도록 보정
-                    ai_angle = max(5, min(ai_angle, 175)) # (너무 낮거나 높지 않게 5~175로 제한)
-
-                    self.current_player.angle = ai_angle
-                    print(f"AI: P1 조준 (기본각: {base_angle_deg:.0f}, 최종각: {ai_angle:.0f})")
-                    self.game_state = "AIM_2"
-                    self.ai_timer = current_time 
-                    
-                    # (이하 AI 2단계 게이지 타이머 설정은 동일)
-                    self.state_timer = current_time 
-                    self.gauge_2_value = 0
-                    self.gauge_2_direction = 1
-                    self.gauge_2_target_value = random.randint(0, self.gauge_2_height - self.gauge_2_target_height)
-                    # --- (AI 조준 로직 끝) ---
-
-                elif self.game_state == "AIM_2":
-                    print("AI: 발사!")
-                    if random.random() < 0.3: 
-                        self.bonus_shot = True
-                        print("AI: SKILL SHOT!")
-                    else:
-                        self.bonus_shot = False
-                        
-                    self.fire_projectile()
+        if self.current_player.is_ai and self.game_state not in ("FIRE", "GAMEOVER"):
+            self.update_ai(current_time)
         # --- (AI 로직 끝) ---
 
 
@@ -637,13 +1709,19 @@ class Game:
                 if self.current_player.angle > 180 or self.current_player.angle < 0:
                     self.gauge_1_angle_speed *= -1
 
+                # 조준 미리보기 궤적 표 (처음이거나 플레이어가 움직였으면 새로 만들기)
+                if not self.headless:
+                    if self.aim_preview is None or not self.aim_preview.valid(self.current_player):
+                        self.aim_preview = AimPreview(self.terrain, self.current_player, self.gauge_1_angle_speed)
+                    self.aim_preview.step()
+
         elif self.game_state == "AIM_2":
             # AI가 아닐 때만 시간 초과
             if not self.current_player.is_ai and (current_time - self.state_timer > self.aim_2_time_limit):
                 self.bonus_shot = False
                 self.multi_shot_counter = 0
                 self.multi_shot_angle = 0
-                print("Time over!")
+                self.log('info', 'time_over', player=self.turn_index + 1)
                 self.fire_projectile()
 
             # (수정) AI가 아닐 때만 게이지 이동
@@ -657,7 +1735,8 @@ class Game:
         elif self.game_state == "FIRE":
             if len(self.projectiles) == 0:
                 if self.multi_shot_counter > 1:
-                    print(f"연속 발사: {self.multi_shot_counter - 1}발 남음")
+                    self.log('debug', 'multi_shot', player=self.turn_index + 1,
+                             remaining=self.multi_shot_counter - 1)
                     self.multi_shot_counter -= 1
                     self.fire_single_projectile(self.multi_shot_angle)
                 
@@ -665,24 +1744,91 @@ class Game:
                     self.multi_shot_counter = 0 
                     self.next_turn() 
 
-        # 공통 업데이트
+        # 공통 업데이트 (잠든 플레이어는 물리 계산을 건너뜀)
+        self.wake_players_on_craters()
         self.players.update(self.terrain)
+        asleep = sum(player.asleep for player in self.player_list)
+        self.body_counts = (asleep, len(self.player_list) - asleep)
+        self.body_ticks_asleep += asleep
+        self.body_ticks_awake += len(self.player_list) - asleep
 
-        new_projectiles_list = []
-        for proj in self.projectiles:
-            new_projs = proj.update(self.terrain, self.players) 
-            if new_projs:
-                new_projectiles_list.extend(new_projs)
-        
-        if new_projectiles_list:
-            self.projectiles.add(new_projectiles_list)
+        for event, owner, x, y in self.projectiles.update(self.terrain, self.players, current_time):
+            self.log('debug' if event == 'split' else 'info', event, player=owner + 1, x=x, y=y)
         
         # 낙사(승리) 조건 확인
         for player in self.player_list:
             if player.rect.top > SCREEN_HEIGHT:
+                if self.game_state != "GAMEOVER":
+                    self.log('info', 'winner', player=2 - self.player_list.index(player))
                 self.game_state = "GAMEOVER"
                 self.winner = self.player_list[1 - self.player_list.index(player)] 
-                print(f"{self.winner.color} 승리!")
+
+    def wake_players_on_craters(self):
+        # 새로 생긴 크레이터가 잠든 플레이어의 발밑(발이 있는 칸과 그 아래 칸)을 건드렸으면 깨우기
+        craters = self.terrain.craters
+        cell = self.terrain.cell_size
+        for x, y, radius in craters[self.craters_seen:]:
+            area = self.terrain.crater_rect(x, y, radius).inflate(cell * 2, cell * 2)
+            for player in self.player_list:
+                if player.asleep and area.collidepoint(player.feet_point()):
+                    player.wake()
+        self.craters_seen = len(craters)
+
+    def update_ai(self, current_time):
+        if self.ai_planner is None or self.ai_planner.player is not self.current_player:
+            opponent = self.player_list[1 - self.turn_index]
+            self.ai_planner = AIPlanner(self.terrain, self.current_player, opponent, self.ai_difficulty)
+
+        # 매 프레임 예산만큼만 탐색 (best 는 언제나 준비되어 있음)
+        move_x, fire_angle, bonus = self.ai_planner.step(self.ai_frame_budget_ms)
+
+        # AI가 "생각"하는 시간 (예: 1초)은 그대로 두고, 그동안 탐색을 계속한다
+        thinking = current_time - self.ai_timer <= 1000
+
+        if self.game_state == "MOVE":
+            # 목표 위치까지 사람과 같은 속도로 이동
+            dx = move_x - self.current_player.rect.centerx
+            if dx:
+                self.current_player.move(1 if dx > 0 else -1, self.terrain)
+
+            arrived = self.current_player.rect.centerx == move_x
+            timed_out = current_time - self.state_timer > self.move_time_limit
+            if (arrived and self.ai_planner.done and not thinking) or timed_out:
+                self.log('debug', 'ai_move_done', player=self.turn_index + 1,
+                         x=self.current_player.rect.centerx, evaluations=self.ai_planner.evaluations)
+                self.game_state = "AIM_1"
+                self.ai_timer = current_time # 타이머 리셋
+                # 실제 도착한 위치에서 각도 다시 다듬기
+                self.ai_planner.refine_from(self.current_player.rect.center)
+
+        elif self.game_state == "AIM_1" and not thinking:
+            # 명중률 설정 (오차 값): 난이도가 낮을수록 최종 각도가 흔들림
+            error = self.ai_planner.settings['aim_error']
+            score = self.ai_planner.best_score
+            ai_angle = max(5, min(fire_angle + random.uniform(-error, error), 175))
+
+            # 발사 각도(0~180)를 플레이어의 방향 + 각도로 변환
+            self.current_player.facing_right = ai_angle <= 90
+            self.current_player.angle = ai_angle if self.current_player.facing_right else 180 - ai_angle
+            self.current_player.image = (self.current_player.image_right if self.current_player.facing_right
+                                         else self.current_player.image_left)
+            self.log('debug', 'ai_aim', player=self.turn_index + 1, angle=round(ai_angle, 1),
+                     planned_angle=fire_angle, score=round(score, 1) if math.isfinite(score) else None,
+                     evaluations=self.ai_planner.evaluations)
+
+            self.game_state = "AIM_2"
+            self.ai_timer = current_time
+            self.state_timer = current_time
+            self.gauge_2_value = 0
+            self.gauge_2_direction = 1
+            self.gauge_2_target_value = random.randint(0, self.gauge_2_height - self.gauge_2_target_height)
+
+        elif self.game_state == "AIM_2" and not thinking:
+            # 스킬을 노렸을 때만 보너스 게이지 성공 확률 적용
+            self.bonus_shot = bonus and random.random() < self.ai_planner.settings['skill_chance']
+            self.log('debug', 'ai_fire', player=self.turn_index + 1, wanted_bonus=bonus, bonus=self.bonus_shot)
+
+            self.fire_projectile()
 
     def fire_projectile(self):
         self.game_state = "FIRE"
@@ -693,7 +1839,6 @@ class Game:
         
         # 1. 레드가 스킬을 쓴 경우
         if self.current_player.char_type == 1 and self.bonus_shot:
-            print("레드 스킬 발동! 3발 연속 발사!")
             self.multi_shot_counter = 3  # (총 3발)
             self.multi_shot_angle = angle
 
@@ -702,21 +1847,21 @@ class Game:
             self.multi_shot_counter = 1  # (총 1발)
             self.multi_shot_angle = angle
 
+        self.log('info', 'fire', player=self.turn_index + 1, char_type=self.current_player.char_type,
+                 angle=round(angle, 1), bonus=self.bonus_shot, shots=self.multi_shot_counter)
+
         # 3. 연속 발사든, 일반 발사든 [첫 번째 발]을 발사합니다.
         self.fire_single_projectile(self.multi_shot_angle)
         
     def fire_single_projectile(self, angle):
         """단일 발사체를 생성하고 그룹에 추가합니다."""
-        proj = Projectile(self.current_player.rect.centerx, 
-                          self.current_player.rect.centery, 
-                          angle, 
-                          self.current_player.char_type, 
-                          self.bonus_shot) # bonus_shot 값은 넘겨주되...
-        
-        # bonus_shot이 스킬 발동 '여부'만 체크하도록,
-        # Projectile 클래스에서는 이 값을 사용하지 않게 해야 함. (explode 수정 필요)
-        
-        self.projectiles.add(proj)
+        self.projectiles.spawn(self.current_player.rect.centerx,
+                               self.current_player.rect.centery,
+                               angle,
+                               self.turn_index,
+                               self.current_player.char_type,
+                               self.bonus_shot,
+                               self.now())
 
 
 
@@ -724,58 +1869,254 @@ class Game:
         self.turn_index = (self.turn_index + 1) % len(self.player_list)
         self.current_player = self.player_list[self.turn_index]
         self.game_state = "MOVE"
-        self.state_timer = pygame.time.get_ticks() # 5초 이동 타이머 시작
+        self.state_timer = self.now() # 5초 이동 타이머 시작
 
         # (추가) 새로 온 턴이 AI 턴이라면, AI 타이머 리셋
+        self.ai_planner = None
+        self.aim_preview = None
         if self.current_player.is_ai:
-            self.ai_timer = pygame.time.get_ticks()
+            self.ai_timer = self.now()
             
-        print(f"플레이어 {self.turn_index + 1} 턴 시작")
+        self.log('info', 'turn_start', player=self.turn_index + 1)
+
+    def snapshot(self):
+        """현재 게임 상태 전체를 작은 바이너리(bytes)로 저장합니다.
+
+        지형은 전체 격자 대신 (맵 번호, 맵 시드, 크레이터 목록)으로 저장하고,
+        타이머는 현재 시각 기준 경과 시간으로 저장하고, 시뮬레이션 틱 수도 함께 저장해서
+        복원한 뒤의 시각(ms 로 자른 값)이 원래 게임과 똑같이 흐르도록 한다.
+        발사체 궤적(particles)은 연출용이라 저장하지 않는다.
+        """
+        now = self.now()
+        winner_index = self.player_list.index(self.winner) if self.winner else -1
+        parts = [
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION),
+            SNAPSHOT_GAME.pack(self.map_index, self.map_seed, self.sim_ticks, self.turn_index,
+                               GAME_STATES.index(self.game_state), winner_index,
+                               now - self.state_timer, now - self.ai_timer,
+                               self.gauge_1_angle_speed, self.gauge_2_value,
+                               self.gauge_2_direction, self.gauge_2_target_value,
+                               self.bonus_shot, self.multi_shot_counter, self.multi_shot_angle,
+                               isinstance(self.terrain, MaskTerrain)),
+        ]
+
+        parts.append(SNAPSHOT_COUNT.pack(len(self.player_list)))
+        for player in self.player_list:
+            parts.append(SNAPSHOT_PLAYER.pack(player.rect.x, player.rect.y, player.vel_x,
+                                              player.vel_y, player.angle, player.facing_right, player.asleep,
+                                              player.sleep_ticks))
+
+        parts.append(SNAPSHOT_COUNT.pack(len(self.projectiles)))
+        projs = self.projectiles
+        for i in range(len(projs)):
+            parts.append(SNAPSHOT_PROJECTILE.pack(projs.x[i], projs.y[i], projs.vel_x[i], projs.vel_y[i],
+                                                  projs.owner[i], projs.char_type[i], projs.bonus_shot[i],
+                                                  projs.split_done[i], now - projs.spawn_time[i]))
+
+        parts.append(SNAPSHOT_COUNT.pack(len(self.terrain.craters)))
+        for crater in self.terrain.craters:
+            parts.append(SNAPSHOT_CRATER.pack(*crater))
+
+        rng_version, rng_internal, rng_gauss = random.getstate()
+        parts.append(SNAPSHOT_RNG.pack(rng_version, *rng_internal, rng_gauss is not None, rng_gauss or 0.0))
+        return b''.join(parts)
+
+    def restore(self, data):
+        """snapshot()으로 저장한 상태로 게임을 되돌립니다."""
+        magic, version = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"지원하지 않는 스냅샷입니다: {magic!r} v{version}")
+        offset = SNAPSHOT_HEADER.size
+
+        (map_index, map_seed, self.sim_ticks, turn_index, state_index, winner_index, state_age, ai_age,
+         self.gauge_1_angle_speed, self.gauge_2_value, self.gauge_2_direction,
+         self.gauge_2_target_value, self.bonus_shot, self.multi_shot_counter,
+         self.multi_shot_angle, pixel_terrain) = SNAPSHOT_GAME.unpack_from(data, offset)
+        offset += SNAPSHOT_GAME.size
+        if pixel_terrain != isinstance(self.terrain, MaskTerrain):
+            raise ValueError("지형 방식(타일/1픽셀)이 다른 게임의 스냅샷입니다.")
+
+        now = self.now()
+        self.last_drawn_state = None # 화면에 보이는 상태가 바뀌었으므로 다시 그리기
+        self.state_timer = now - state_age
+        self.ai_timer = now - ai_age
+        self.turn_index = turn_index
+        self.current_player = self.player_list[turn_index]
+        self.game_state = GAME_STATES[state_index]
+        self.winner = self.player_list[winner_index] if winner_index >= 0 else None
+
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        for player in self.player_list[:count]:
+            (player.rect.x, player.rect.y, player.vel_x, player.vel_y,
+             player.angle, player.facing_right, player.asleep,
+             player.sleep_ticks) = SNAPSHOT_PLAYER.unpack_from(data, offset)
+            offset += SNAPSHOT_PLAYER.size
+            player.image = player.image_right if player.facing_right else player.image_left
+
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        self.projectiles.clear()
+        for _ in range(count):
+            x, y, vel_x, vel_y, owner, char_type, bonus_shot, split_done, spawn_age = \
+                SNAPSHOT_PROJECTILE.unpack_from(data, offset)
+            offset += SNAPSHOT_PROJECTILE.size
+            self.projectiles.add(x, y, vel_x, vel_y, owner, char_type, bonus_shot, split_done, now - spawn_age)
+
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        craters = [SNAPSHOT_CRATER.unpack_from(data, offset + i * SNAPSHOT_CRATER.size) for i in range(count)]
+        offset += count * SNAPSHOT_CRATER.size
+
+        # 다른 맵의 스냅샷이면 원본 지형부터 다시 생성
+        if (map_index, map_seed) != (self.map_index, self.map_seed):
+            self.load_map(map_index, map_seed)
+        self.terrain.restore_craters(craters)
+        self.craters_seen = len(craters)
+
+        rng = SNAPSHOT_RNG.unpack_from(data, offset)
+        random.setstate((rng[0], tuple(rng[1:626]), rng[627] if rng[626] else None))
+
+        # 턴마다 만드는 AI 탐색기 / 궤적 표는 스냅샷에 없으므로 되돌린 상태에서 다시 만든다
+        self.ai_planner = None
+        self.aim_preview = None
 
 
     # 화면에 출력되는 함수
     def draw(self):
+        if self.headless:
+            return
+        if self.renderer:
+            self.draw_textured()
+            return
+
+        scale = self.render_scale
+        if scale == 1:
+            self.draw_world(self.surface, 1)
+            self.draw_hud(self.surface, 1)
+        else:
+            # 월드는 작은 내부 화면에 그리고, 창 크기로 한 번만 확대
+            # (최근접 확대: smoothscale 은 확대 비용이 줄인 그리기 비용보다 커서 배율 1 보다 느리다)
+            self.draw_world(self.world_surface, scale)
+            if not self.hud_full_res:
+                self.draw_hud(self.world_surface, scale)
+            pygame.transform.scale(self.world_surface, self.surface.get_size(), self.surface)
+            if self.hud_full_res:
+                self.draw_hud(self.surface, 1)
+
+        pygame.display.flip()
+
+    def draw_textured(self):
+        # 텍스처 렌더러로 그리기 (draw_world + draw_hud 와 같은 순서와 모양)
+        renderer = self.renderer
         if self.background_image:
-            self.surface.blit(self.background_image, (0, 0))
+            renderer.blit(self.background_image, (0, 0))
         else: # 이미지 로드 실패시 출력되는 화면 창
-            self.surface.fill(SKY_BLUE)
+            renderer.clear(SKY_BLUE)
+
+        renderer.draw_terrain(self.terrain)
+
+        for player in self.player_list:
+            renderer.blit(player.image, player.rect)
+        start, end = self.current_player.aim_line()
+        renderer.line(self.current_player.color, start, end, 3)
+        for x, y in self.aim_preview_dots():
+            renderer.fill_rect(WHITE, (x - 2, y - 2, 4, 4))
+
+        projectiles = self.projectiles
+        for x, y, char_type, trail in zip(projectiles.x, projectiles.y, projectiles.char_type, projectiles.trails):
+            for point_x, point_y in trail:
+                # 반지름 1 원 (pygame.draw.circle 과 같은 2x2 픽셀)
+                renderer.fill_rect(YELLOW, (round(point_x) - 1, round(point_y) - 1, 2, 2))
+            image = projectile_image(char_type)
+            renderer.blit(image, image.get_rect(center=(round(x), round(y))))
+
+        renderer.draw_hud(lambda surface: self.draw_hud(surface, 1))
+        renderer.present()
+
+    def scaled_image(self, image, scale):
+        # 내부 해상도에 맞게 줄인 이미지 (한 번만 만들고 재사용)
+        if scale == 1:
+            return image
+        if image not in self.scaled_images:
+            width, height = image.get_size()
+            self.scaled_images[image] = pygame.transform.smoothscale(
+                image, (max(1, round(width * scale)), max(1, round(height * scale))))
+        return self.scaled_images[image]
+
+    def aim_preview_dots(self):
+        # AIM_1 중인 사람 플레이어의 예상 궤적 점 (미리보기가 없으면 빈 목록)
+        if self.game_state != "AIM_1" or self.aim_preview is None or not self.aim_preview.valid(self.current_player):
+            return []
+        return self.aim_preview.dots(self.current_player.angle)
+
+    def draw_world(self, surface, scale):
+        # 배경, 지형, 캐릭터, 조준선, 발사체/궤적
+        background = self.background_image
+        if background and scale != 1:
+            background = self.scaled_image(background, scale)
+        if background:
+            surface.blit(background, (0, 0))
+        else: # 이미지 로드 실패시 출력되는 화면 창
+            surface.fill(SKY_BLUE)
         
         # 지형 그리기
-        self.terrain.draw(self.surface)
+        self.terrain.draw(surface, scale)
         
         # 플레이어 그리기
-        self.players.draw(self.surface)
-        self.current_player.draw_aim_indicator(self.surface) # 현재 플레이어 조준선
+        if scale == 1:
+            self.players.draw(surface)
+        else:
+            for player in self.player_list:
+                surface.blit(self.scaled_image(player.image, scale),
+                             (round(player.rect.x * scale), round(player.rect.y * scale)))
+        self.current_player.draw_aim_indicator(surface, scale) # 현재 플레이어 조준선
+        for x, y in self.aim_preview_dots(): # 예상 궤적 점선
+            pygame.draw.circle(surface, WHITE, (round(x * scale), round(y * scale)), max(1, round(2 * scale)))
         
         # 발사체 및 궤적 그리기
-        for proj in self.projectiles:
-            proj.draw(self.surface)
-
-        # UI 그리기
-        turn_text = self.font.render(f"Player {self.turn_index + 1}'s Turn", True, self.current_player.color)
-        self.surface.blit(turn_text, (SCREEN_WIDTH // 2 - turn_text.get_width() // 2, 10))
+        self.projectiles.draw(surface, scale, self.scaled_image)
+
+    def draw_hud(self, surface, scale):
+        # UI 그리기 (scale 이 1이 아니면 내부 해상도에 맞춰 위치/글자 크기를 줄여서 그림)
+        # 그린 영역(Rect) 목록을 돌려준다 (텍스처 렌더러는 이 영역만 다시 올림)
+        dirty = []
+        def at(x, y):
+            return round(x * scale), round(y * scale)
+
+        def scaled_rect(x, y, width, height):
+            left, top = at(x, y)
+            right, bottom = at(x + width, y + height)
+            return pygame.Rect(left, top, right - left, bottom - top)
+
+        font = self.font if scale == 1 else get_font(max(8, round(36 * scale)))
+        restart_font = self.restart_font if scale == 1 else get_font(max(8, round(30 * scale)))
+        center_x = round(SCREEN_WIDTH * scale) // 2
+
+        turn_text = font.render(f"Player {self.turn_index + 1}'s Turn", True, self.current_player.color)
+        dirty.append(surface.blit(turn_text, (center_x - turn_text.get_width() // 2, at(0, 10)[1])))
         
-        state_text = self.font.render(f"State: {self.game_state}", True, WHITE)
-        self.surface.blit(state_text, (10, 10))
+        state_text = font.render(f"State: {self.game_state}", True, WHITE)
+        dirty.append(surface.blit(state_text, at(10, 10)))
 
         # [1. 이동 상태 UI]
         if self.game_state == "MOVE":
-            remaining_time = (self.move_time_limit - (pygame.time.get_ticks() - self.state_timer)) / 1000.0
-            time_text = self.font.render(f"Move: {remaining_time:.1f}s", True, WHITE)
-            self.surface.blit(time_text, (self.current_player.rect.centerx - 30, self.current_player.rect.top - 40))
+            remaining_time = (self.move_time_limit - (self.now() - self.state_timer)) / 1000.0
+            time_text = font.render(f"Move: {remaining_time:.1f}s", True, WHITE)
+            dirty.append(surface.blit(time_text, at(self.current_player.rect.centerx - 30, self.current_player.rect.top - 40)))
 
         # [2. 조준 1단계 UI (각도)]
         elif self.game_state == "AIM_1":
-            angle_text = self.font.render(f"Angle: {self.current_player.angle:.0f}", True, WHITE)
-            self.surface.blit(angle_text, (self.current_player.rect.centerx - 30, self.current_player.rect.top - 40))
+            angle_text = font.render(f"Angle: {self.current_player.angle:.0f}", True, WHITE)
+            dirty.append(surface.blit(angle_text, at(self.current_player.rect.centerx - 30, self.current_player.rect.top - 40)))
             # (UI는 draw_aim_indicator가 대체)
 
         # [3. 조준 2단계 UI (보너스 샷)]
         elif self.game_state == "AIM_2":
             # 3초 타이머
-            remaining_time = (self.aim_2_time_limit - (pygame.time.get_ticks() - self.state_timer)) / 1000.0
-            time_text = self.font.render(f"BONUS: {remaining_time:.1f}s", True, RED)
-            self.surface.blit(time_text, (SCREEN_WIDTH // 2 - time_text.get_width() // 2, 50))
+            remaining_time = (self.aim_2_time_limit - (self.now() - self.state_timer)) / 1000.0
+            time_text = font.render(f"BONUS: {remaining_time:.1f}s", True, RED)
+            dirty.append(surface.blit(time_text, (center_x - time_text.get_width() // 2, at(0, 50)[1])))
             
             # 1. 게이지 위치 설정 (플레이어 기준)
             gauge_width = 20
@@ -790,66 +2131,64 @@ class Game:
             gauge_y = self.current_player.rect.centery - (self.gauge_2_height // 2) # 플레이어 Y 중앙에 맞춤
             
             # 게이지 전체 배경
-            gauge_rect = pygame.Rect(gauge_x, gauge_y, gauge_width, self.gauge_2_height)
-            pygame.draw.rect(self.surface, BLACK, gauge_rect)
+            gauge_rect = scaled_rect(gauge_x, gauge_y, gauge_width, self.gauge_2_height)
+            dirty.append(pygame.draw.rect(surface, BLACK, gauge_rect))
             
             # 2. 랜덤 타겟 (게이지 값 0~200을 Y좌표로 변환)
             target_y_pos = gauge_y + self.gauge_2_target_value
-            target_rect = pygame.Rect(gauge_x, target_y_pos, gauge_width, self.gauge_2_target_height)
-            pygame.draw.rect(self.surface, GREEN, target_rect)
+            target_rect = scaled_rect(gauge_x, target_y_pos, gauge_width, self.gauge_2_target_height)
+            dirty.append(pygame.draw.rect(surface, GREEN, target_rect))
             
             # 3. 현재 위치 표시 (게이지 값 0~200을 Y좌표로 변환)
             indicator_y_pos = gauge_y + self.gauge_2_value
-            indicator_rect = pygame.Rect(gauge_x, indicator_y_pos, gauge_width, 5) # 두께 5
-            pygame.draw.rect(self.surface, YELLOW, indicator_rect)
+            indicator_rect = scaled_rect(gauge_x, indicator_y_pos, gauge_width, 5) # 두께 5
+            dirty.append(pygame.draw.rect(surface, YELLOW, indicator_rect))
 
         elif self.game_state == "GAMEOVER":
-            win_text = self.font.render(f"Player {self.player_list.index(self.winner) + 1} WINS!", True, self.winner.color, BLACK)
-            self.surface.blit(win_text, (SCREEN_WIDTH // 2 - win_text.get_width() // 2, SCREEN_HEIGHT // 2 - win_text.get_height() // 2))
+            center_y = round(SCREEN_HEIGHT * scale) // 2
+            win_text = font.render(f"Player {self.player_list.index(self.winner) + 1} WINS!", True, self.winner.color, BLACK)
+            dirty.append(surface.blit(win_text, (center_x - win_text.get_width() // 2, center_y - win_text.get_height() // 2)))
             # 재시작 안내 텍스트 출력
-            restart_font = pygame.font.SysFont(None, 30) 
             restart_text = restart_font.render("Press 'R' to Restart", True, WHITE, BLACK)
-            self.surface.blit(restart_text, (SCREEN_WIDTH // 2 - restart_text.get_width() // 2, SCREEN_HEIGHT // 2 + 40))
-
-        pygame.display.flip()
+            dirty.append(surface.blit(restart_text, (center_x - restart_text.get_width() // 2, center_y + at(0, 40)[1])))
+        return dirty
 
 # 메인 화면 출력과 케릭터 선택창 만들기
-def character_selection_screen(screen, clock):
+def character_selection_screen(screen, clock, startup_timer=None, renderer=None):
 
     # 배경 이미지 추가
     try:
-        main_background_image = pygame.image.load('./images/시작화면배경.png').convert()
-        main_background_image = pygame.transform.scale(main_background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    except pygame.error as e:
+        main_background_image = load_image('./images/시작화면배경.png', (SCREEN_WIDTH, SCREEN_HEIGHT))
+    except (pygame.error, OSError) as e:
         print(f"메인 배경 이미지 로드 실패: {e}")
         main_background_image = None # 로드 실패 시 None으로 설정
 
     # 케릭터 이미지 붙이기
-    p1_img = pygame.image.load('./images/red.png').convert_alpha()
-    p2_img = pygame.image.load('./images/blue.png').convert_alpha()
-    p3_img = pygame.image.load('./images/green.png').convert_alpha()
-
     preview_size1 = (200, 200) # 선택창에 보여줄 이미지 크기 (조절 가능)
     preview_size2 = (120, 120) # 선택창에 보여줄 이미지 크기 (조절 가능)
     preview_size3 = (200, 200) # 선택창에 보여줄 이미지 크기 (조절 가능)
     
     # (수정) 4번 CPU 이미지 (파란색 재활용)
     char_images = {
-        1: pygame.transform.scale(p1_img, preview_size1),
-        2: pygame.transform.scale(p2_img, preview_size2),
-        3: pygame.transform.scale(p3_img, preview_size3),
-        4: pygame.transform.scale(p2_img, preview_size2) 
+        1: load_image('./images/red.png', preview_size1, alpha=True),
+        2: load_image('./images/blue.png', preview_size2, alpha=True),
+        3: load_image('./images/green.png', preview_size3, alpha=True),
+        4: load_image('./images/blue.png', preview_size2, alpha=True)
     }
+    if startup_timer:
+        startup_timer.mark("선택창 이미지")
     
-    # 폰트 로딩 방식을 SysFont로 되돌립니다
+    # 폰트는 처음 쓸 때 초기화 (기본 폰트)
     try:
-        font_large = pygame.font.SysFont(None, 72)
-        font_small = pygame.font.SysFont(None, 48)
+        font_large = get_font(72)
+        font_small = get_font(48)
     except Exception as e:
         print(f"폰트 로드 실패! {e}")
-        # (SysFont는 거의 항상 성공하므로 이 코드는 예방용입니다)
+        # (기본 폰트는 거의 항상 성공하므로 이 코드는 예방용입니다)
         pygame.quit()
         sys.exit()
+    if startup_timer:
+        startup_timer.mark("폰트 초기화")
     # ---------------------------------------------------
     
     p1_choice = 1 # 1: Red, 2: Blue, 3: Green
@@ -860,7 +2199,7 @@ def character_selection_screen(screen, clock):
 
     while True:
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+            if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
                 return 'QUIT' # 종료
             if event.type == pygame.KEYDOWN:
                 # P1 선택 (A, D 키)
@@ -955,20 +2294,173 @@ def character_selection_screen(screen, clock):
         screen.blit(transparent_surface_start, (start_box_x, start_box_y))
         screen.blit(start_text, (SCREEN_WIDTH // 2 - start_text.get_width() // 2, SCREEN_HEIGHT - 100))
 
-        pygame.display.flip()
+        if renderer:
+            renderer.present_surface(screen)
+        else:
+            pygame.display.flip()
+        if startup_timer:
+            startup_timer.mark("첫 화면")
+            startup_timer.report()
         clock.tick(FPS)
 
+# 화면 없이 AI 대 AI 한 경기를 끝까지 돌리고 승자 번호(시간 초과면 None)를 돌려주기
+def run_headless_match(p1_type, p2_type, event_log=None, max_ticks=SIM_HZ * 120, ai_difficulty='easy'):
+    game = Game(None, p1_type, p2_type, True, ai_difficulty, event_log=event_log, is_ai_p1=True)
+    while game.game_state != "GAMEOVER" and game.sim_ticks < max_ticks:
+        game.update()
+    return game.player_list.index(game.winner) + 1 if game.winner else None
+
+# 현재 프로세스의 상주 메모리(RSS, 바이트)
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # (리눅스 외에는 최대 RSS 로 대신함 - macOS 는 바이트, 그 외는 KB 단위)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def match_memory_report(run_match, top=10):
+    """run_match() 로 한 경기를 돌리면서 tracemalloc 으로 최대 사용량 / 경기 후 남은 할당 / 주요 할당 위치를 잽니다.
+
+    run_match 는 경기가 끝나면 Game 을 들고 있지 않아야 한다. (남은 할당 = 누수 후보)
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    start_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    result = run_match()
+
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return result, {
+        'peak': peak - start_size,
+        'retained': sum(stat.size_diff for stat in stats),
+        'top': [(str(stat.traceback), stat.size_diff, stat.count_diff) for stat in stats[:top] if stat.size_diff],
+    }
+
+def print_memory_report(report, title="메모리 리포트"):
+    print(f"[{title}] 최대 {report['peak'] / 1024:.0f} KiB, 경기 후 남은 할당 {report['retained'] / 1024:+.0f} KiB")
+    for site, size_diff, count_diff in report['top']:
+        print(f"    {size_diff / 1024:+8.1f} KiB {count_diff:+6d}개  {site}")
+
+def soak(matches, memory_report=False, growth_limit_mb=8.0):
+    """헤드리스로 재시작을 matches 번 반복하면서 RSS 가 계속 늘어나면 실패(1)를 돌려줍니다."""
+    event_log = EventLog(level='warning')
+    samples = []
+    for match in range(1, matches + 1):
+        p1_type, p2_type = random.randint(1, 3), random.randint(1, 3)
+        if memory_report:
+            _, report = match_memory_report(lambda: run_headless_match(p1_type, p2_type, event_log))
+            print_memory_report(report, f"경기 {match}")
+        else:
+            run_headless_match(p1_type, p2_type, event_log)
+        gc.collect()
+        samples.append(rss_bytes())
+        if match % 10 == 0 or match == matches:
+            print(f"soak {match}/{matches}: RSS {samples[-1] / 2**20:.1f} MiB")
+    event_log.close()
+
+    # 처음 1/4 은 캐시가 채워지는 구간이라 빼고, 앞쪽 절반과 뒤쪽 절반의 중앙값 비교
+    steady = samples[len(samples) // 4:]
+    half = len(steady) // 2
+    if half == 0:
+        print("soak: 경기 수가 너무 적어 판정할 수 없습니다.")
+        return 0
+    first = sorted(steady[:half])[half // 2]
+    last = sorted(steady[half:])[(len(steady) - half) // 2]
+    growth_mb = (last - first) / 2**20
+    print(f"soak 결과: {first / 2**20:.1f} MiB -> {last / 2**20:.1f} MiB ({growth_mb:+.1f} MiB, 허용 {growth_limit_mb} MiB)")
+    if growth_mb > growth_limit_mb:
+        print("soak 실패: 재시작할수록 메모리가 계속 늘어납니다.")
+        return 1
+    return 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gontress")
+    parser.add_argument('--render-fps', type=int, default=FPS,
+                        help="렌더링 FPS 상한 (시뮬레이션은 항상 SIM_HZ 로 진행)")
+    parser.add_argument('--ai-difficulty', choices=tuple(AI_DIFFICULTY), default='normal',
+                        help="컴퓨터(AI) 난이도 (생각하는 시간, 탐색 후보 수, 스킬 성공률, 조준 오차)")
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help="월드를 그릴 내부 해상도 배율 (예: 0.5 -> 640x360 에 그린 뒤 확대)")
+    parser.add_argument('--hud-low-res', action='store_true',
+                        help="HUD 도 내부 해상도로 그리기 (기본: HUD 는 원래 해상도)")
+    parser.add_argument('--renderer', choices=('surface', 'texture'), default='surface',
+                        help="surface: 기존 Surface 그리기 / texture: SDL2 텍스처 렌더러 (가속이 없으면 소프트웨어)")
+    parser.add_argument('--pixel-terrain', action='store_true',
+                        help="지형을 1픽셀 단위 비트마스크로 처리 (둥근 크레이터, 픽셀 단위 충돌)")
+    parser.add_argument('--input-latency', action='store_true',
+                        help="경기마다 키 입력 -> 화면 표시 지연을 상태별 히스토그램으로 출력")
+    parser.add_argument('--skill-timing', choices=('frame', 'event'), default='frame',
+                        help="보너스 게이지 판정 시점 (frame: 처리할 때 / event: 키가 도착한 순간)")
+    parser.add_argument('--event-log', metavar='PATH',
+                        help="이벤트 로그(JSON lines)를 저장할 파일 (기본: stdout)")
+    parser.add_argument('--log-level', choices=sorted(LOG_LEVELS, key=LOG_LEVELS.get), default='info')
+    parser.add_argument('--summarize-log', metavar='PATH',
+                        help="저장된 이벤트 로그의 경기별 통계를 출력하고 종료")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="경기마다 tracemalloc 메모리 리포트(최대/남은 할당/주요 위치) 출력")
+    parser.add_argument('--startup-timing', action='store_true',
+                        help="시작부터 첫 화면까지 단계별 시간 출력")
+    parser.add_argument('--soak', type=int, metavar='N',
+                        help="헤드리스로 N 경기 재시작을 반복하고 메모리가 계속 늘면 실패로 종료")
+    args = parser.parse_args()
+    if args.render_fps <= 0:
+        parser.error("--render-fps 는 0보다 커야 합니다.")
+    if args.renderer == 'texture' and args.render_scale != 1:
+        parser.error("--renderer texture 는 --render-scale 과 함께 쓸 수 없습니다.")
+    return args
+
 def main():
     """ 메인 게임 루프 (재시작 처리) """
-    pygame.init()
-    pygame.font.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Artillery Knock-off Game Prototype")
+    args = parse_args()
+    if args.summarize_log:
+        for match, stats in summarize_event_log(args.summarize_log).items():
+            print(f"[경기 {match}]", json.dumps(stats, ensure_ascii=False))
+        return
+
+    if args.soak:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        sys.exit(soak(args.soak, args.memory_report))
+
+    startup_timer = StartupTimer(args.startup_timing)
+    event_log = EventLog(args.event_log, args.log_level)
+    # 화면만 먼저 초기화 (폰트는 처음 쓸 때, 사운드/조이스틱은 쓰지 않으므로 초기화하지 않음)
+    pygame.display.init()
+    startup_timer.mark("디스플레이 초기화")
+    renderer = None
+    if args.renderer == 'texture':
+        try:
+            # 이미지 convert() 에 필요한 픽셀 포맷만 얻는 숨은 창 (실제 창은 렌더러가 만든다)
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+            renderer = TextureRenderer("Artillery Knock-off Game Prototype", (SCREEN_WIDTH, SCREEN_HEIGHT))
+            screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert() # 선택창은 여기에 그린 뒤 올림
+        except (RuntimeError, pygame.error) as e:
+            print(f"텍스처 렌더러를 사용할 수 없어 Surface 렌더링으로 실행합니다. {e}")
+            renderer = None
+    if renderer is None:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Artillery Knock-off Game Prototype")
+    startup_timer.mark("창 생성")
     clock = pygame.time.Clock() # 캐릭터 선택창에서도 사용하기 위해
 
     while True:
         # 1. 캐릭터 선택창 표시
-        choices = character_selection_screen(screen, clock)
+        choices = character_selection_screen(screen, clock, startup_timer, renderer)
         if choices == 'QUIT':
             break
         
@@ -976,8 +2468,21 @@ def main():
         p1_type, p2_type, p2_is_ai = choices
         
         # 2. 게임 시작 (선택된 캐릭터로)
-        game = Game(screen, p1_type, p2_type, p2_is_ai) 
-        game_status = game.run()
+        def play():
+            game = Game(screen, p1_type, p2_type, p2_is_ai, args.ai_difficulty, render_fps=args.render_fps,
+                        event_log=event_log, render_scale=args.render_scale,
+                        hud_full_res=not args.hud_low_res, renderer=renderer,
+                        input_latency=args.input_latency, skill_timing=args.skill_timing,
+                        pixel_terrain=args.pixel_terrain)
+            status = game.run()
+            if game.input_latency:
+                game.input_latency.print_report()
+            return status
+        if args.memory_report:
+            game_status, report = match_memory_report(play)
+            print_memory_report(report)
+        else:
+            game_status = play()
 
         if game_status == 'QUIT':
             break # 전체 게임 종료
@@ -985,6 +2490,7 @@ def main():
         # game_status가 'RESTART'면, while 루프가 처음으로 돌아가
         # character_selection_screen()을 다시 실행합니다.
 
+    event_log.close()
     pygame.quit()
     sys.exit()
 
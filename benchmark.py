@@ -0,0 +1,132 @@
+import os
+import time
+import random
+import argparse
+
+# 렌더링 벤치마크 모음
+# 화면 없이(SDL dummy 드라이버) 같은 장면을 여러 번 그려서 프레임당 시간을 잰다.
+#
+# 사용 예)
+#   python benchmark.py                 # 전부 실행
+#   python benchmark.py render_scale    # 내부 렌더링 해상도별 프레임 시간
+#   python benchmark.py renderer        # Surface 렌더링 vs 텍스처 렌더러
+#   python benchmark.py terrain         # 타일(5px) 지형 vs 1픽셀 비트마스크 지형
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+import Pygame_main as game_main
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def make_scene(screen, seed=7, **game_options):
+    """AI 대 AI 경기를 발사체가 날아가는 순간까지 진행한 장면을 만듭니다. (seed 가 같으면 같은 장면)"""
+    random.seed(seed)
+    event_log = game_main.EventLog(level='warning')
+    game = game_main.Game(screen, 1, 3, True, 'easy', event_log=event_log, is_ai_p1=True, **game_options)
+    while not (game.game_state == "FIRE" and len(game.projectiles)) and game.sim_ticks < game_main.SIM_HZ * 60:
+        game.update()
+    for _ in range(20): # 궤적이 조금 그려지도록
+        game.update()
+    return game
+
+def time_frames(draw, frames):
+    # 프레임 하나(draw + flip)에 걸린 시간 (ms)
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        draw()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def print_row(name, times, baseline=None):
+    mean = sum(times) / len(times)
+    speedup = f"{baseline / mean:5.2f}x" if baseline else "  기준"
+    print(f"  {name:<28} 평균 {mean:7.2f} ms   p95 {percentile(times, 95):7.2f} ms   {speedup}")
+    return mean
+
+def bench_render_scale(screen, frames):
+    """내부 렌더링 해상도 배율별 프레임 시간 (HUD 원래 해상도 / 내부 해상도)."""
+    baseline = None
+    for scale in (1.0, 0.75, 0.5):
+        for hud_full_res in ((True,) if scale == 1 else (True, False)):
+            game = make_scene(screen, render_scale=scale, hud_full_res=hud_full_res)
+            mean = print_row(f"scale {scale:<4} HUD {'full' if hud_full_res else 'low'}",
+                             time_frames(game.draw, frames), baseline)
+            baseline = baseline or mean
+
+def pixel_difference(a, b):
+    # 두 화면에서 색이 다른(채널 차이 > 16) 픽셀 비율
+    a, b = pygame.image.tobytes(a, 'RGB'), pygame.image.tobytes(b, 'RGB')
+    different = sum(1 for i in range(0, len(a), 3)
+                    if max(abs(a[i] - b[i]), abs(a[i + 1] - b[i + 1]), abs(a[i + 2] - b[i + 2])) > 16)
+    return different / (len(a) // 3)
+
+def bench_renderer(screen, frames):
+    """Surface 렌더링과 텍스처 렌더러(SDL 소프트웨어 렌더러)의 프레임 시간과 화면 차이."""
+    if game_main.sdl2_video is None:
+        print("  pygame._sdl2.video 가 없어 건너뜁니다.")
+        return
+    game = make_scene(screen)
+    baseline = print_row("surface", time_frames(game.draw, frames))
+    reference = screen.copy()
+
+    renderer = game_main.TextureRenderer("benchmark", screen.get_size(), accelerated=False)
+    game = make_scene(screen, renderer=renderer)
+    print_row("texture", time_frames(game.draw, frames), baseline)
+    print(f"  화면 차이 {pixel_difference(reference, renderer.renderer.to_surface()) * 100:.2f}% 픽셀")
+
+    # 크레이터가 생기는 프레임: 지형 텍스처는 크레이터 영역만 다시 올린다
+    uploads = renderer.terrain_uploads
+    def draw_with_crater():
+        game.terrain.destroy_terrain(random.randrange(game_main.SCREEN_WIDTH), 500, 40)
+        game.draw()
+    print_row("texture + 크레이터", time_frames(draw_with_crater, frames), baseline)
+    print(f"  지형 텍스처 갱신 {renderer.terrain_uploads - uploads}회 (전체 다시 올리기 없음)")
+
+def bench_terrain(screen, frames):
+    """타일(5px) 지형과 1픽셀 비트마스크 지형의 프레임 시간 (그리기 / 매 프레임 크레이터 + 틱 + 그리기)."""
+    games = {name: make_scene(screen, pixel_terrain=pixel_terrain)
+             for name, pixel_terrain in (("5px tiles", False), ("1px mask", True))}
+
+    baseline = None
+    for name, game in games.items():
+        mean = print_row(f"{name} 그리기", time_frames(game.draw, frames), baseline)
+        baseline = baseline or mean
+
+    baseline = None
+    for name, game in games.items():
+        def tick_with_crater():
+            game.terrain.destroy_terrain(random.randrange(game_main.SCREEN_WIDTH), 560, 40)
+            game.update()
+            game.draw()
+        mean = print_row(f"{name} 크레이터+틱", time_frames(tick_with_crater, frames), baseline)
+        baseline = baseline or mean
+
+BENCHMARKS = {
+    'render_scale': bench_render_scale,
+    'renderer': bench_renderer,
+    'terrain': bench_terrain,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Gontress 렌더링 벤치마크")
+    parser.add_argument('names', nargs='*', help=f"실행할 벤치마크 {list(BENCHMARKS)} (기본: 전부)")
+    parser.add_argument('--frames', type=int, default=120)
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"알 수 없는 벤치마크입니다: {name}")
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((game_main.SCREEN_WIDTH, game_main.SCREEN_HEIGHT))
+    for name in args.names or BENCHMARKS:
+        print(f"[{name}] {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name](screen, args.frames)
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import sys
+import random
+import hashlib
+import argparse
+
+# 시뮬레이션 점검 스크립트 (화면 없이 실행, 실패하면 종료 코드 1)
+# - snapshot: snapshot() -> restore() 후 같은 틱을 돌리면 원래 경기와 틱마다 같은 상태가 되는지
+# - projectile: ProjectileBatch 의 궤적/크레이터/넉백이 예전 스프라이트 Projectile 과 같은지
+#
+# 사용 예)
+#   python check_sim.py                 # 전부 실행
+#   python check_sim.py snapshot
+#   python check_sim.py projectile
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+import Pygame_main as game_main
+
+# ---------------------------------------------------------------- 스냅샷
+
+SNAPSHOT_SEEDS = (1, 2, 3)
+SNAPSHOT_TICKS = game_main.SIM_HZ * 40
+AI_BUDGET_MS = 10_000 # AI 탐색이 매 턴 첫 틱에 끝나도록 (시간 예산에 따라 결과가 달라지지 않게)
+
+def make_match(seed, p1_type, p2_type):
+    random.seed(seed)
+    game = game_main.Game(None, p1_type, p2_type, True, 'easy',
+                          event_log=game_main.EventLog(level='warning'), is_ai_p1=True)
+    game.ai_frame_budget_ms = AI_BUDGET_MS
+    return game
+
+def tick_state(game):
+    # 틱마다 비교할 상태 (경과 틱 수는 게임마다 다르므로 제외)
+    projectiles = game.projectiles
+    return (game.game_state, game.turn_index, game.gauge_2_value, len(game.terrain.craters),
+            tuple((player.rect.topleft, player.vel_x, player.vel_y, player.angle, player.asleep)
+                  for player in game.player_list),
+            tuple(zip(projectiles.x, projectiles.y, projectiles.vel_x, projectiles.vel_y)))
+
+def check_snapshot():
+    """snapshot() -> restore() 후 같은 틱 수를 돌리면 원래 경기와 틱마다 같은 상태가 되는지 확인합니다."""
+    failures = 0
+    for seed in SNAPSHOT_SEEDS:
+        p1_type, p2_type = seed % 3 + 1, (seed + 1) % 3 + 1
+        game = make_match(seed, p1_type, p2_type)
+        # 되돌릴 지점: 시작 직후 + 발사체가 날아가는 중 (AI 탐색기는 스냅샷에 없으므로 턴 안에서
+        # 탐색을 다시 하지 않는 지점만 고른다)
+        snapshots = {0: game.snapshot()}
+        states = []
+        while game.sim_ticks < SNAPSHOT_TICKS and game.game_state != "GAMEOVER":
+            game.update()
+            states.append(tick_state(game))
+            if (game.game_state == "FIRE" and len(game.projectiles) and len(snapshots) < 4
+                    and game.sim_ticks - max(snapshots) > game_main.SIM_HZ):
+                snapshots[game.sim_ticks] = game.snapshot()
+        final = game.snapshot()
+
+        for start, data in snapshots.items():
+            replay = make_match(seed + 1000, p1_type, p2_type) # 다른 맵/난수에서 시작해도 같아야 함
+            replay.restore(data)
+            mismatch = None
+            for expected in states[start:]:
+                replay.update()
+                if tick_state(replay) != expected:
+                    mismatch = replay.sim_ticks + start
+                    break
+            if mismatch is None and replay.snapshot() != final:
+                mismatch = 'final snapshot'
+            ok = mismatch is None
+            failures += not ok
+            print(f"  seed {seed} 틱 {start:>5} 에서 복원 -> {len(states) - start:5d}틱 재생  "
+                  f"{'OK' if ok else f'불일치 (틱 {mismatch})'}")
+    return failures
+
+# ---------------------------------------------------------------- 발사체 물리
+
+# 기준 궤적: 예전 스프라이트 Projectile (fc1a82e) 으로 같은 장면을 돌려 기록한 값
+# (캐릭터, 스킬) -> (날아간 틱 수, 틱별 위치 + 넉백 해시, 크레이터, 넉백 후 플레이어 속도)
+SHOT_ANGLE = 70
+SHOT_START = (320, 380)
+SHOT_MAP_SEED = 7
+SHOT_PATHS = {
+    (1, False): (160, '3c33e153c3b6ea23', [(867, 551, 40)], [(0.0, 0.0), (1.793813, -4.7414)]),
+    (1, True):  (160, '3c33e153c3b6ea23', [(867, 551, 40)], [(0.0, 0.0), (1.793813, -4.7414)]),
+    (2, False): (160, '3c33e153c3b6ea23', [(867, 551, 40)], [(0.0, 0.0), (1.793813, -4.7414)]),
+    (2, True):  (160, '8b56b3a5b4a90a2f', [(867, 551, 70)], [(0.0, 0.0), (2.350956, -6.214038)]),
+    (3, False): (160, '3c33e153c3b6ea23', [(867, 551, 40)], [(0.0, 0.0), (1.793813, -4.7414)]),
+    (3, True):  (161, '9cc5b43a66e3b944', [(749, 551, 40), (867, 551, 40), (985, 551, 40)],
+                 [(0.0, 0.0), (1.793813, -4.7414)]),
+}
+
+def record_shot(char_type, bonus_shot):
+    # 평원 맵에서 한 발을 쏘고 모든 발사체가 사라질 때까지 틱마다 위치를 기록
+    terrain = game_main.Terrain()
+    terrain.create_map_1(random.Random(SHOT_MAP_SEED))
+    players = [game_main.Player(320, 420, game_main.RED, {}, 1), game_main.Player(880, 520, game_main.BLUE, {}, 2)]
+    for player in players:
+        player.vel_x = player.vel_y = 0.0
+
+    projectiles = game_main.ProjectileBatch()
+    projectiles.spawn(*SHOT_START, SHOT_ANGLE, 0, char_type, bonus_shot, 0)
+    path = []
+    tick = 0
+    while len(projectiles) and tick < 600:
+        tick += 1
+        projectiles.update(terrain, players, int(tick * game_main.SIM_STEP_MS))
+        path.append(tuple((round(x), round(y)) for x, y in zip(projectiles.x, projectiles.y)))
+    velocities = [(round(player.vel_x, 6), round(player.vel_y, 6)) for player in players]
+    digest = hashlib.sha1(repr((path, velocities)).encode()).hexdigest()[:16]
+    return tick, digest, [tuple(crater) for crater in terrain.craters], velocities
+
+def check_projectile():
+    """ProjectileBatch 의 궤적/크레이터/넉백이 예전 스프라이트 Projectile 으로 기록한 값과 같은지 확인합니다."""
+    failures = 0
+    for (char_type, bonus_shot), expected in SHOT_PATHS.items():
+        result = record_shot(char_type, bonus_shot)
+        ok = result == expected
+        failures += not ok
+        print(f"  캐릭터 {char_type} 스킬 {'O' if bonus_shot else 'X'}  {result[0]:3d}틱  크레이터 {len(result[2])}개  "
+              f"{'OK' if ok else f'불일치 {result} != {expected}'}")
+    return failures
+
+CHECKS = {
+    'snapshot': check_snapshot,
+    'projectile': check_projectile,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Gontress 시뮬레이션 점검")
+    parser.add_argument('names', nargs='*', help=f"실행할 점검 {list(CHECKS)} (기본: 전부)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in CHECKS:
+            parser.error(f"알 수 없는 점검입니다: {name}")
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1)) # 이미지 convert() 용
+    failures = 0
+    for name in args.names or CHECKS:
+        print(f"[{name}] {CHECKS[name].__doc__}")
+        failures += CHECKS[name]()
+    pygame.quit()
+    print("점검 실패" if failures else "모두 통과")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+import os
+import json
+import time
+import socket
+import socketserver
+import threading
+import itertools
+import random
+import argparse
+import multiprocessing
+from collections import defaultdict, deque
+
+# 여러 개의 헤드리스 Game 을 한 프로세스에서 돌리는 멀티 룸 매치 서버
+# - 워커 프로세스 1개 = 룸 여러 개. 스케줄러 틱마다 모든 룸을 한 번씩 update() 한다.
+# - 메인 프로세스는 로컬 소켓(127.0.0.1)으로 클라이언트를 받고, 새 룸은 가장 한가한 워커에 배정한다.
+# - 'loadgen' 은 사람 대신 키를 누르는 대역 클라이언트, 'bench' 는 룸 수를 늘려가며 코어당 룸 수를 잰다.
+#
+# 사용 예)
+#   python match_server.py serve --workers 4
+#   python match_server.py loadgen --clients 50
+#   python match_server.py bench --workers 2
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 50507
+AI_SHARE = 0.5           # 틱 시간 중 AI 탐색에 나눠 쓸 비율 (룸 수로 나눔)
+ROOM_IDLE_TIMEOUT = 60   # 이 시간(초) 동안 아무 요청이 없는 룸은 정리
+STATS_WINDOW = 5000      # 워커가 기억하는 최근 틱 수
+CHAR_TYPES = (1, 2, 3)   # 룸을 만들 때 고를 수 있는 캐릭터 번호
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def latency_summary(values):
+    return {'p50': round(percentile(values, 50), 3),
+            'p95': round(percentile(values, 95), 3),
+            'p99': round(percentile(values, 99), 3),
+            'max': round(max(values), 3) if values else 0.0}
+
+
+# ---------------------------------------------------------------- 워커 프로세스
+
+class Room:
+    def __init__(self, game_main, p1_type, p2_type, ai, difficulty, event_log):
+        self.game = game_main.Game(None, p1_type, p2_type, ai[1], difficulty,
+                                   event_log=event_log, is_ai_p1=ai[0])
+        self.game.held_keys = defaultdict(bool) # 클라이언트가 누르고 있는 키
+        self.last_request = time.monotonic()
+
+    def key(self, pygame, player, control, down):
+        game = self.game
+        key = game.player_list[player].controls[control]
+        game.held_keys[key] = down
+        if down:
+            game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+    def state(self):
+        game = self.game
+        return {
+            'state': game.game_state,
+            'turn': game.turn_index + 1,
+            'tick': game.sim_ticks,
+            'players': [[player.rect.centerx, player.rect.centery] for player in game.player_list],
+            'projectiles': len(game.projectiles),
+            'winner': game.player_list.index(game.winner) + 1 if game.winner else None,
+        }
+
+
+def worker_main(worker_id, conn, tick_hz):
+    # 화면 없이 돌리기 (이미지 convert 를 위해 1x1 더미 화면만 만든다)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import pygame
+    import Pygame_main as game_main
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    event_log = game_main.EventLog(level='warning')
+
+    rooms = {}
+    room_numbers = itertools.count(1)
+    tick_ms = 1000 / tick_hz
+    tick_times = deque(maxlen=STATS_WINDOW)   # 틱 하나에 걸린 시간 (ms)
+    tick_delays = deque(maxlen=STATS_WINDOW)  # 예정 시각보다 늦게 시작한 시간 (ms)
+
+    def handle(request):
+        cmd = request.get('cmd')
+        if cmd == 'create':
+            p1, p2 = request.get('p1', 1), request.get('p2', 2)
+            ai = request.get('ai', [False, True])
+            difficulty = request.get('difficulty', 'easy')
+            if p1 not in CHAR_TYPES or p2 not in CHAR_TYPES:
+                return {'error': f"p1/p2 must be one of {CHAR_TYPES}"}
+            if not isinstance(ai, list) or len(ai) != 2:
+                return {'error': "ai must be [bool, bool]"}
+            if difficulty not in game_main.AI_DIFFICULTY:
+                return {'error': f"unknown difficulty {difficulty}"}
+            room_id = f"{worker_id}:{next(room_numbers)}"
+            rooms[room_id] = Room(game_main, p1, p2, [bool(flag) for flag in ai], difficulty, event_log)
+            return {'room': room_id, 'rooms': len(rooms)}
+        if cmd == 'stats':
+            stats = {'worker': worker_id, 'rooms': len(rooms), 'ticks': len(tick_times),
+                     'tick_ms': latency_summary(list(tick_times)),
+                     'tick_delay_ms': latency_summary(list(tick_delays))}
+            if request.get('reset'):
+                tick_times.clear()
+                tick_delays.clear()
+            return stats
+
+        room = rooms.get(request.get('room'))
+        if room is None:
+            return {'error': 'unknown room'}
+        room.last_request = time.monotonic()
+        if cmd == 'state':
+            return room.state()
+        if cmd == 'key':
+            player, control = request.get('player'), request.get('key')
+            if player not in (1, 2):
+                return {'error': "player must be 1 or 2"}
+            if control not in room.game.player_list[player - 1].controls:
+                return {'error': f"unknown key {control}"}
+            room.key(pygame, player - 1, control, bool(request.get('down', True)))
+            return {'ok': True}
+        if cmd == 'close':
+            del rooms[request['room']]
+            return {'ok': True, 'rooms': len(rooms)}
+        return {'error': f"unknown command {cmd}"}
+
+    ticks = 0
+    next_tick = time.perf_counter()
+    while True:
+        # 다음 틱까지 남은 시간 동안 명령 처리
+        timeout = next_tick - time.perf_counter()
+        if conn.poll(max(0.0, timeout)):
+            request_id, request = conn.recv()
+            if request is None:
+                break
+            # 잘못된 요청 하나 때문에 워커(와 그 위의 모든 룸)가 죽지 않도록 오류는 응답으로 돌려준다
+            try:
+                reply = handle(request) if isinstance(request, dict) else {'error': "request must be an object"}
+            except Exception as e:
+                event_log.log('warning', 'request_failed', worker=worker_id, cmd=str(request.get('cmd')),
+                              error=f"{type(e).__name__}: {e}")
+                reply = {'error': f"{type(e).__name__}: {e}"}
+            conn.send((request_id, reply))
+            continue
+
+        # 스케줄러 틱: 모든 룸을 한 번씩 진행
+        start = time.perf_counter()
+        tick_delays.append((start - next_tick) * 1000)
+        budget = AI_SHARE * tick_ms / max(1, len(rooms))
+        for room in rooms.values():
+            room.game.ai_frame_budget_ms = budget
+            room.game.update()
+        tick_times.append((time.perf_counter() - start) * 1000)
+        ticks += 1
+
+        next_tick += tick_ms / 1000
+        if time.perf_counter() - next_tick > tick_ms / 1000 * 5:
+            next_tick = time.perf_counter() # 너무 밀렸으면 따라잡기 포기
+
+        # 오래 방치된 룸 정리
+        if ticks % 600 == 0:
+            now = time.monotonic()
+            for room_id in [rid for rid, room in rooms.items() if now - room.last_request > ROOM_IDLE_TIMEOUT]:
+                del rooms[room_id]
+
+    event_log.close()
+
+
+# ---------------------------------------------------------------- 메인 프로세스
+
+class WorkerHandle:
+    def __init__(self, worker_id, context, tick_hz):
+        self.worker_id = worker_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(worker_id, child_conn, tick_hz), daemon=True)
+        self.process.start()
+        self.rooms = 0
+        self.request_ids = itertools.count()
+        self.send_lock = threading.Lock()
+        self.pending = {} # 요청 번호 -> [Event, 응답]
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+
+    def read_loop(self):
+        while True:
+            try:
+                request_id, reply = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            slot = self.pending.pop(request_id, None)
+            if slot:
+                slot[1] = reply
+                slot[0].set()
+
+    def call(self, request, timeout=5.0):
+        slot = [threading.Event(), None]
+        with self.send_lock:
+            request_id = next(self.request_ids)
+            self.pending[request_id] = slot
+            self.conn.send((request_id, request))
+        if not slot[0].wait(timeout):
+            self.pending.pop(request_id, None)
+            return {'error': 'worker timeout'}
+        if 'rooms' in slot[1]:
+            self.rooms = slot[1]['rooms']
+        return slot[1]
+
+    def stop(self):
+        with self.send_lock:
+            self.conn.send((None, None))
+        self.process.join(2)
+
+
+class MatchServer:
+    def __init__(self, workers, tick_hz=60):
+        context = multiprocessing.get_context('spawn')
+        self.workers = [WorkerHandle(i, context, tick_hz) for i in range(workers)]
+        self.create_lock = threading.Lock()
+
+    def route(self, request):
+        cmd = request.get('cmd')
+        if cmd == 'create':
+            # 가장 한가한(룸이 적은) 워커에 배정
+            with self.create_lock:
+                worker = min(self.workers, key=lambda w: w.rooms)
+                worker.rooms += 1
+            return worker.call(request)
+        if cmd == 'stats':
+            return {'workers': [worker.call(dict(request)) for worker in self.workers]}
+        try:
+            worker = self.workers[int(str(request.get('room')).split(':')[0])]
+        except (ValueError, IndexError):
+            return {'error': 'unknown room'}
+        return worker.call(request)
+
+    def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if isinstance(request, dict):
+                            reply = server.route(request)
+                        else:
+                            reply = {'error': "request must be an object"}
+                    except (ValueError, KeyError) as e:
+                        reply = {'error': str(e)}
+                    self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.tcp_server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.tcp_server.daemon_threads = True
+        self.tcp_server.serve_forever()
+
+    def stop(self):
+        if hasattr(self, 'tcp_server'):
+            self.tcp_server.shutdown()
+            self.tcp_server.server_close()
+        for worker in self.workers:
+            worker.stop()
+
+
+# ---------------------------------------------------------------- 클라이언트 / 부하 생성기
+
+class MatchClient:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, retries=50):
+        for attempt in range(retries):
+            try:
+                self.sock = socket.create_connection((host, port))
+                break
+            except ConnectionRefusedError:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(0.1)
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, **request):
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.sock.close()
+
+
+def stand_in_player(client, stop, poll_interval=0.2):
+    """사람 대신 P1 을 조종하는 대역 클라이언트 (P2 는 서버 AI). 경기가 끝나면 새 룸을 만든다."""
+    rng = random.Random()
+    while not stop.is_set():
+        room = client.request(cmd='create', p1=rng.randint(1, 3), p2=rng.randint(1, 3),
+                              ai=[False, True], difficulty='easy')['room']
+        wait_until = 0
+        while not stop.is_set():
+            state = client.request(cmd='state', room=room)
+            if 'error' in state or state['state'] == 'GAMEOVER':
+                break
+            now = time.monotonic()
+            if state['turn'] == 1 and now >= wait_until:
+                if state['state'] == 'MOVE':
+                    client.request(cmd='key', room=room, player=1, key=rng.choice(('left', 'right')),
+                                   down=rng.random() < 0.5)
+                elif state['state'] in ('AIM_1', 'AIM_2'):
+                    client.request(cmd='key', room=room, player=1, key='fire')
+                    client.request(cmd='key', room=room, player=1, key='fire', down=False)
+                wait_until = now + rng.uniform(0.3, 1.5) # 사람처럼 조금 기다렸다 누르기
+            stop.wait(poll_interval)
+        client.request(cmd='close', room=room)
+
+
+def run_load_generator(clients, host=DEFAULT_HOST, port=DEFAULT_PORT, stop=None):
+    stop = stop or threading.Event()
+    threads = []
+    for _ in range(clients):
+        thread = threading.Thread(target=stand_in_player, args=(MatchClient(host, port), stop), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return stop, threads
+
+
+def run_bench(workers, step, max_rooms, settle, port):
+    """룸 수를 step 씩 늘리면서 틱 지연을 재고, 틱 예산 안에 들어오는 최대 룸 수로 코어당 룸 수를 구합니다."""
+    server = MatchServer(workers)
+    threading.Thread(target=server.serve, args=(DEFAULT_HOST, port), daemon=True).start()
+    client = MatchClient(port=port)
+    tick_budget_ms = 1000 / 60
+    stop = threading.Event()
+    rooms = 0
+    sustainable = 0
+
+    print(f"워커 {workers}개, 틱 예산 {tick_budget_ms:.1f}ms")
+    print(f"{'rooms':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'delay p99':>10}")
+    try:
+        while rooms < max_rooms:
+            run_load_generator(step, port=port, stop=stop)
+            rooms += step
+            time.sleep(settle)
+            client.request(cmd='stats', reset=True) # 룸 생성 구간은 버리기
+            time.sleep(settle)
+            stats = client.request(cmd='stats', reset=True)['workers']
+            worst = max(stats, key=lambda w: w['tick_ms']['p99'])
+            print(f"{rooms:>6} {worst['tick_ms']['p50']:>8} {worst['tick_ms']['p95']:>8} "
+                  f"{worst['tick_ms']['p99']:>8} {worst['tick_ms']['max']:>8} {worst['tick_delay_ms']['p99']:>10}")
+            if worst['tick_ms']['p99'] > tick_budget_ms:
+                break
+            sustainable = rooms
+    finally:
+        stop.set()
+        server.stop()
+
+    print(f"틱 예산 안에 들어온 최대 룸 수: {sustainable} -> 코어당 룸 수: {sustainable / workers:.1f}")
+    return sustainable / workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gontress 멀티 룸 매치 서버")
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    serve = sub.add_parser('serve', help="서버 실행")
+    serve.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    loadgen = sub.add_parser('loadgen', help="대역 클라이언트로 부하 주기")
+    loadgen.add_argument('--clients', type=int, default=20)
+    loadgen.add_argument('--port', type=int, default=DEFAULT_PORT)
+    loadgen.add_argument('--duration', type=float, default=60)
+
+    bench = sub.add_parser('bench', help="코어당 룸 수 / 틱 지연 측정")
+    bench.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    bench.add_argument('--step', type=int, default=10, help="한 번에 늘릴 룸 수")
+    bench.add_argument('--max-rooms', type=int, default=1000)
+    bench.add_argument('--settle', type=float, default=3.0, help="측정 구간 길이(초)")
+    bench.add_argument('--port', type=int, default=DEFAULT_PORT + 1)
+
+    args = parser.parse_args()
+    if args.mode == 'serve':
+        server = MatchServer(args.workers)
+        print(f"매치 서버 시작: {DEFAULT_HOST}:{args.port} (워커 {args.workers}개)")
+        try:
+            server.serve(DEFAULT_HOST, args.port)
+        except KeyboardInterrupt:
+            server.stop()
+    elif args.mode == 'loadgen':
+        stop, _ = run_load_generator(args.clients, port=args.port)
+        time.sleep(args.duration)
+        stop.set()
+        print(json.dumps(MatchClient(port=args.port).request(cmd='stats'), indent=2))
+    elif args.mode == 'bench':
+        run_bench(args.workers, args.step, args.max_rooms, args.settle, args.port)
+
+
+if __name__ == "__main__":
+    main()